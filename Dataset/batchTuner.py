@@ -0,0 +1,79 @@
+import logging
+from typing import Dict, Any, Optional
+
+# Bytes a friend id takes in a user line beyond the id itself: the quotes and comma around it in a
+# JSON array, or the ", " separator of the Yelp comma separated string. The loaders use it to split
+# the input bytes of a user line between the user and its friendships.
+FRIEND_SEPARATOR_BYTES = 3
+
+
+class BatchSizeTuner:
+    """Chooses the number of documents per write batch of a loader from the measured commit latency.
+
+    The loader asks full() whether the batch it is filling should be written, and after writing it
+    reports the batch with record(). The tuner keeps a moving average of the throughput and of the
+    input bytes per document, and moves the batch size toward the size that would take target_seconds
+    to commit at that throughput, at most doubling or halving it per batch. max_bytes caps the input
+    bytes of one batch, so a few users with huge friend arrays cannot make a batch that exhausts the
+    client's memory or the server's message size, while small documents such as tips grow into large
+    batches. With target_seconds None the size stays at initial.
+    """
+
+    def __init__(self, name: str, initial: int = 1000, target_seconds: Optional[float] = 0.5,
+                 min_size: int = 10, max_size: int = 100000, max_bytes: int = 16 * 1024 * 1024,
+                 smoothing: float = 0.3, logger: Optional[logging.Logger] = None):
+        self.name = name
+        self.size = initial
+        self.target_seconds = target_seconds
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.smoothing = smoothing
+        self.logger = logger or logging.getLogger(__name__)
+        self.rate: Optional[float] = None  # documents per second
+        self.bytes_per_document: Optional[float] = None
+        self.batches = self.documents = 0
+        self.seconds = 0.0
+        self.min_chosen = self.max_chosen = initial
+
+    def full(self, count: int, nbytes: int = 0) -> bool:
+        return count >= self.size or nbytes >= self.max_bytes
+
+    def average(self, current: Optional[float], value: float) -> float:
+        return value if current is None else self.smoothing * value + (1 - self.smoothing) * current
+
+    def record(self, count: int, nbytes: int, seconds: float):
+        """Account for one committed batch of count documents read from nbytes of input"""
+        self.batches += 1
+        self.documents += count
+        self.seconds += seconds
+        if self.target_seconds is None or count == 0 or seconds <= 0:
+            return
+        self.rate = self.average(self.rate, count / seconds)
+        self.bytes_per_document = self.average(self.bytes_per_document, nbytes / count)
+
+        size = min(self.rate * self.target_seconds, self.size * 2)
+        size = max(size, self.size / 2)
+        if self.bytes_per_document > 0:
+            size = min(size, self.max_bytes / self.bytes_per_document)
+        size = int(max(self.min_size, min(self.max_size, size)))
+        # Small corrections are noise in the latency; they would only flood the log
+        if abs(size - self.size) >= 0.1 * self.size:
+            self.logger.info(f"{self.name}: Batch size {self.size:,} -> {size:,} " +
+                             f"({seconds:.3f} s for {count:,} documents, {self.rate:.0f} documents/second)")
+            self.size = size
+            self.min_chosen = min(self.min_chosen, size)
+            self.max_chosen = max(self.max_chosen, size)
+
+    def summary(self) -> Dict[str, Any]:
+        """Log and return the batch sizes chosen over the load"""
+        average_seconds = self.seconds / self.batches if self.batches else 0.0
+        self.logger.info(f"{self.name}: {self.batches:,} batches, final batch size {self.size:,} " +
+                         f"(range {self.min_chosen:,}-{self.max_chosen:,}), {average_seconds:.3f} s per batch")
+        return {
+            'batch_size': self.size,
+            'min_batch_size': self.min_chosen,
+            'max_batch_size': self.max_chosen,
+            'batches': self.batches,
+            'average_batch_time': average_seconds
+        }
@@ -1,61 +1,158 @@
 import json
 import random
-import copy
+import hashlib
+import os
 import re
-from typing import Dict, List, Tuple, Any
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, List, Tuple, Any, Optional, Iterable, Union
 
+import numpy as np
 
-def clean_json_string(json_str: str) -> str:
-    # Remove // comments
-    json_str = re.sub(r'//.*$', '', json_str)
-    # Remove any trailing commas before closing braces/brackets
-    json_str = re.sub(r',(\s*[}\]])', r'\1', json_str)
-    return json_str
+from jsonUtils import decode_json_line, dumps
+from recordStore import RecordStore
+
+
+def record_key(obj: Dict[str, Any]) -> Optional[str]:
+    """Return the ID a record is keyed by, or None if it has no usable ID"""
+    if 'text' in obj:  # for tips, create an artificial ID (tips also carry business_id/user_id)
+        # A digest rather than hash(): str hashes are salted per process, so worker processes of
+        # load_jsonl_file_parallel would key the same tip differently
+        return hashlib.blake2b((obj['text'] + obj['date']).encode('utf-8'), digest_size=8).hexdigest()
+    elif 'business_id' in obj:
+        return obj['business_id']
+    elif 'user_id' in obj:
+        return obj['user_id']
+    return None
+
+
+def parse_jsonl_lines(lines: Iterable[str], filename: str) -> Dict[str, Any]:
+    data = {}
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('//'):  # Skip empty lines and comment lines
+            continue
+        try:
+            # Parse each line, cleaning it only if the strict parse fails
+            obj = decode_json_line(line)
+
+            # Each object should have an ID field
+            key = record_key(obj)
+            if key is not None:
+                data[key] = obj
+
+        except json.JSONDecodeError as e:
+            print(f"Error parsing line in {filename}: {str(e)}")
+            print(f"Problematic line: {line[:100]}...")
+            continue
+    return data
 
 
 def load_jsonl_file(filename: str) -> Dict[str, Any]:
+    with open(filename, 'r', encoding='utf-8') as f:
+        return parse_jsonl_lines(f, filename)
+
+
+def split_file_ranges(filename: str, num_chunks: int) -> List[Tuple[int, int]]:
+    """Split a file into up to num_chunks byte ranges that each start and end on a line boundary"""
+    size = os.path.getsize(filename)
+    boundaries = [0]
+    with open(filename, 'rb') as f:
+        for i in range(1, num_chunks):
+            f.seek(max(size * i // num_chunks, boundaries[-1]))
+            f.readline()  # move to the start of the next line
+            position = min(f.tell(), size)
+            if position > boundaries[-1]:
+                boundaries.append(position)
+    if boundaries[-1] < size:
+        boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def load_jsonl_range(filename: str, start: int, end: int) -> Dict[str, Any]:
+    """Parse the lines in the byte range [start, end) of a JSONL file"""
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        chunk = f.read(end - start)
+    return parse_jsonl_lines(chunk.decode('utf-8').splitlines(), filename)
+
+
+def load_jsonl_file_parallel(filename: str, workers: Optional[int] = None,
+                             chunk_bytes: int = 64 * 1024 * 1024) -> Dict[str, Any]:
+    """Parse a JSONL file in a process pool, one newline-aligned byte range per task.
+
+    Returns the same dict as load_jsonl_file. Chunks are merged in file order so that
+    a later duplicate ID still wins, as it does in the sequential loader.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return load_jsonl_file(filename)
+    num_chunks = max(workers, -(-os.path.getsize(filename) // chunk_bytes))
+    ranges = split_file_ranges(filename, num_chunks)
+
     data = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_data in executor.map(load_jsonl_range, repeat(filename), *zip(*ranges)):
+            data.update(chunk_data)
+    return data
+
+
+def sample_jsonl_file(filename: str, sample_size: int) -> Tuple[Dict[str, Any], int]:
+    """Reservoir-sample sample_size records from a JSONL file in a single pass.
+
+    Only the sampled records are kept in memory, and a line is parsed only when it
+    enters the reservoir, so memory scales with sample_size instead of the file size.
+    Returns the sampled records (keyed like load_jsonl_file) and the number of records seen.
+    """
+    reservoir: List[Tuple[str, Any]] = []
+    seen = 0
     with open(filename, 'r', encoding='utf-8') as f:
         for line in f:
             line = line.strip()
             if not line or line.startswith('//'):  # Skip empty lines and comment lines
                 continue
+            # Algorithm R: the n-th record replaces a random slot with probability k/n
+            slot = seen if seen < sample_size else random.randint(0, seen)
+            seen += 1
+            if slot >= sample_size:
+                continue
             try:
-                # Clean and parse each line
-                cleaned_line = clean_json_string(line)
-                obj = json.loads(cleaned_line)
-
-                # Each object should have an ID field
-                if 'business_id' in obj:
-                    data[obj['business_id']] = obj
-                elif 'user_id' in obj:
-                    data[obj['user_id']] = obj
-                elif 'text' in obj:  # for tips, create an artificial ID
-                    tip_id = str(hash(obj['text'] + obj['date']))
-                    data[tip_id] = obj
-
+                obj = decode_json_line(line)
             except json.JSONDecodeError as e:
                 print(f"Error parsing line in {filename}: {str(e)}")
                 print(f"Problematic line: {line[:100]}...")
+                seen -= 1
                 continue
-    return data
+            key = record_key(obj)
+            if key is None:
+                seen -= 1
+                continue
+            if slot == len(reservoir):
+                reservoir.append((key, obj))
+            else:
+                reservoir[slot] = (key, obj)
+    return dict(reservoir), seen
 
 
-def save_jsonl_file(data: Dict[str, Any], filename: str):
+def save_jsonl_file(data: Union[Dict[str, Any], RecordStore], filename: str):
     with open(filename, 'w', encoding='utf-8') as f:
         for item in data.values():
-            f.write(json.dumps(item) + '\n')
+            f.write(dumps(item) + '\n')
+
+
+COMPLIMENT_TYPES = [
+    'compliment_hot', 'compliment_more', 'compliment_profile',
+    'compliment_cute', 'compliment_list', 'compliment_note',
+    'compliment_plain', 'compliment_cool', 'compliment_funny',
+    'compliment_writer', 'compliment_photos'
+]
+
+ELITE_YEARS = list(range(2012, 2023))  # 2012 to 2022
 
 
 def generate_random_compliments() -> Dict[str, int]:
     """Generate random compliment counts, all under 100"""
-    compliment_types = [
-        'compliment_hot', 'compliment_more', 'compliment_profile',
-        'compliment_cute', 'compliment_list', 'compliment_note',
-        'compliment_plain', 'compliment_cool', 'compliment_funny',
-        'compliment_writer', 'compliment_photos'
-    ]
-    return {compliment_type: random.randint(0, 99) for compliment_type in compliment_types}
+    return {compliment_type: random.randint(0, 99) for compliment_type in COMPLIMENT_TYPES}
 
 
 def generate_random_elite_years() -> List[int]:
@@ -63,77 +160,296 @@ def generate_random_elite_years() -> List[int]:
     num_elite_years = random.randint(0, 10)  # Can be elite for 0 to 10 years
     if num_elite_years == 0:
         return []
-    possible_years = list(range(2012, 2023))  # 2012 to 2022
-    selected_years = sorted(random.sample(possible_years, num_elite_years))
+    selected_years = sorted(random.sample(ELITE_YEARS, num_elite_years))
     return selected_years
 
-def generate_reduced_dataset(source_users: str, source_businesses: str, source_tips: str,
-                             output_users: str, output_businesses: str, output_tips: str,
-                             max_users: int, max_businesses: int, max_tips: int,
-                             max_friends: int, fixed_friend: bool, random_compliments: bool, random_elite_years: bool,
-                             random_tip_compliments: bool):
-    print("Loading data files...")
-    try:
-        users = load_jsonl_file(source_users)
-        businesses = load_jsonl_file(source_businesses)
-        tips = load_jsonl_file(source_tips)
-    except Exception as e:
-        print(f"Error loading files: {str(e)}")
-        return
 
+def generate_random_elite_year_columns(num_users: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized generate_random_elite_years for num_users users, as a CSR pair of
+    (offsets, indices into ELITE_YEARS) with each user's years in ascending order"""
+    counts = rng.integers(0, 11, size=num_users)  # Can be elite for 0 to 10 years
+    # Rank the years of every user in a random order and keep the first `count` of them
+    ranks = np.argsort(np.argsort(rng.random((num_users, len(ELITE_YEARS))), axis=1), axis=1)
+    _, year_indices = np.nonzero(ranks < counts[:, None])
+    offsets = np.zeros(num_users + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets, year_indices
+
+
+def zipf_indices(n: int, size: int, skew: float, rng: np.random.Generator) -> np.ndarray:
+    """Draw size values from 0..n-1 where value k has weight 1 / (k + 1) ** skew.
+
+    skew 0 is uniform; around 1 is a classic Zipf distribution with a few very hot values.
+    """
+    if skew <= 0:
+        return rng.integers(0, n, size=size)
+    weights = np.arange(1, n + 1, dtype=np.float64) ** -skew
+    return rng.choice(n, size=size, p=weights / weights.sum())
+
+
+def distribution_stats(counts: np.ndarray) -> Dict[str, float]:
+    """Summarize how skewed a per-entity count distribution is (e.g. tips per user)"""
+    if len(counts) == 0:
+        return {}
+    ordered = np.sort(counts)
+    total = ordered.sum()
+    top = max(len(ordered) // 100, 1)
+    # Gini coefficient: 0 for a perfectly even distribution, close to 1 when one entity has everything
+    gini = float((2 * np.arange(1, len(ordered) + 1) - len(ordered) - 1).dot(ordered) / (len(ordered) * total)) \
+        if total else 0.0
+    return {
+        'mean': float(ordered.mean()),
+        'median': float(np.median(ordered)),
+        'p99': float(np.percentile(ordered, 99)),
+        'max': int(ordered[-1]),
+        'top_1_percent_share': float(ordered[-top:].sum() / total) if total else 0.0,
+        'gini': gini,
+    }
+
+
+def generate_friend_edges(num_users: int, max_friends: int, fixed_friend: bool,
+                          rng: Optional[np.random.Generator] = None,
+                          skew: float = 0.0, first_source: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Generate the whole friend graph at once as a CSR adjacency over user indices.
+
+    Returns (offsets, targets): the friends of user first_source + i are targets[offsets[i]:offsets[i + 1]].
+    Only users first_source..num_users-1 get friends (all of them by default), but friends are drawn
+    from every user, so first_source lets newly appended users befriend existing ones.
+    Each user gets max_friends friends if fixed_friend, otherwise 0..max_friends drawn uniformly,
+    or from a power law with exponent skew if skew > 0 (most users have few friends, a few
+    have close to max_friends). Degrees are capped at num_users - 1. Friends are distinct and
+    never the user itself.
+    """
+    if rng is None:
+        rng = np.random.default_rng(random.getrandbits(64))
+    num_sources = num_users - first_source
+    max_degree = max(num_users - 1, 0)
+    if fixed_friend:
+        degrees = np.full(num_sources, min(max_friends, max_degree), dtype=np.int64)
+    else:
+        degrees = np.minimum(zipf_indices(max_friends + 1, num_sources, skew, rng), max_degree)
+
+    offsets = np.zeros(num_sources + 1, dtype=np.int64)
+    np.cumsum(degrees, out=offsets[1:])
+    sources = np.repeat(np.arange(first_source, num_users, dtype=np.int64), degrees)
+    if len(sources) == 0:
+        return offsets, sources
+
+    # Draw a non-zero offset per edge so that (source + offset) % n is never the source itself,
+    # then redraw only the edges that collide with an earlier edge of the same source
+    targets = (sources + rng.integers(1, num_users, size=len(sources))) % num_users
+    keys = sources * num_users + targets
+    dense_rows = np.flatnonzero(2 * degrees > num_users) + first_source
+    active = np.flatnonzero(2 * degrees[sources - first_source] <= num_users)
+    for _ in range(20):
+        order = active[np.argsort(keys[active], kind='stable')]
+        pending = order[1:][keys[order[1:]] == keys[order[:-1]]]
+        if len(pending) == 0:
+            break
+        targets[pending] = (sources[pending] + rng.integers(1, num_users, size=len(pending))) % num_users
+        keys[pending] = sources[pending] * num_users + targets[pending]
+        active = np.flatnonzero(np.isin(sources, np.unique(sources[pending])))
+    else:
+        dense_rows = np.union1d(dense_rows, sources[active])
+
+    # Rows with a degree close to n (or that did not converge) are sampled directly
+    for user in dense_rows:
+        start, end = offsets[user - first_source], offsets[user - first_source + 1]
+        chosen = rng.choice(num_users - 1, size=end - start, replace=False)
+        targets[start:end] = (user + 1 + chosen) % num_users
+    return offsets, targets
+
+
+def build_user_store(user_items: List[Tuple[str, Any]], random_compliments: bool, random_elite_years: bool,
+                     rng: np.random.Generator) -> RecordStore:
+    """Copy users into a RecordStore and randomize their compliments and elite years;
+    friends are left for the caller to fill in"""
+    overwritten = ['friends'] + (COMPLIMENT_TYPES if random_compliments else []) + \
+                  (['elite'] if random_elite_years else [])
+    store = RecordStore([user_data for _, user_data in user_items], skip=overwritten,
+                        keys=[user_id for user_id, _ in user_items])
+
+    # Update compliments with random values
+    if random_compliments:
+        for compliment_type in COMPLIMENT_TYPES:
+            store.set_column(compliment_type, rng.integers(0, 100, size=len(store)))
+
+    # Update elite years
+    if random_elite_years:
+        elite_offsets, elite_years = generate_random_elite_year_columns(len(store), rng)
+        store.set_list_column('elite', elite_offsets, elite_years, ELITE_YEARS)
+    return store
+
+
+def build_reduced_dataset(users: Dict[str, Any], businesses: Dict[str, Any], tips: Dict[str, Any],
+                          max_users: int, max_businesses: int, max_tips: int,
+                          max_friends: int, fixed_friend: bool, random_compliments: bool, random_elite_years: bool,
+                          random_tip_compliments: bool, tip_user_skew: float = 0.0, tip_business_skew: float = 0.0,
+                          friend_skew: float = 0.0) \
+        -> Tuple[RecordStore, Dict[str, Any], RecordStore, Dict[str, Dict[str, float]]]:
+    """Sample and randomize a reduced dataset from already loaded records; the inputs are not modified.
+
+    Users and tips are returned as RecordStores whose randomized fields are whole-column overwrites;
+    businesses are returned as-is, since they are not modified.
+    tip_user_skew, tip_business_skew and friend_skew are Zipf exponents for how tip authors, tipped
+    businesses and friend counts are drawn (0 is uniform). The realized tips-per-user,
+    tips-per-business and friend degree distributions are summarized in the returned stats.
+    """
     print("Selecting random samples...")
     # Select random samples
     selected_user_items = random.sample(list(users.items()), min(max_users, len(users)))
     selected_business_items = random.sample(list(businesses.items()), min(max_businesses, len(businesses)))
     selected_tip_items = random.sample(list(tips.items()), min(max_tips, len(tips)))
-
-    # Create new datasets
-    new_users = {}
-    new_businesses = {}
-    new_tips = {}
+    rng = np.random.default_rng(random.getrandbits(64))
 
     print("Processing users...")
     # Process users first
-    user_ids = []
-    for user_id, user_data in selected_user_items:
-        user_ids.append(user_id)
-        new_user = copy.deepcopy(user_data)
-
-        # Update compliments with random values
-        if random_compliments:
-            random_compliments = generate_random_compliments()
-            for compliment_type, count in random_compliments.items():
-                new_user[compliment_type] = count
-
-        # Update elite years
-        if random_elite_years:
-            new_user['elite'] = generate_random_elite_years()
-
-        new_users[user_id] = new_user
+    user_ids = [user_id for user_id, _ in selected_user_items]
+    new_users = build_user_store(selected_user_items, random_compliments, random_elite_years, rng)
 
     # Now update friends lists
     print("Generating friend relationships...")
-    for user_id in new_users:
-        num_friends = min(random.randint(0, max_friends), len(user_ids)) if not fixed_friend else max_friends
-        new_users[user_id]['friends'] = random.sample(user_ids, num_friends)
+    friend_offsets, friend_targets = generate_friend_edges(len(user_ids), max_friends, fixed_friend, rng,
+                                                           skew=friend_skew)
+    new_users.set_list_column('friends', friend_offsets, friend_targets, user_ids)
 
     print("Processing businesses...")
     # Process businesses
-    business_ids = []
-    for business_id, business_data in selected_business_items:
-        business_ids.append(business_id)
-        new_businesses[business_id] = business_data
+    new_businesses = dict(selected_business_items)
+    business_ids = list(new_businesses)
 
     print("Processing tips...")
     # Process tips
-    for tip_id, tip_data in selected_tip_items:
-        new_tip = copy.deepcopy(tip_data)
-        new_tip['user_id'] = random.choice(user_ids)
-        new_tip['business_id'] = random.choice(business_ids)
-        # Update tip compliment count
+    overwritten = ['user_id', 'business_id'] + (['compliment_count'] if random_tip_compliments else [])
+    new_tips = RecordStore([tip_data for _, tip_data in selected_tip_items], skip=overwritten,
+                           keys=[tip_id for tip_id, _ in selected_tip_items])
+    tip_users = zipf_indices(len(user_ids), len(new_tips), tip_user_skew, rng)
+    tip_businesses = zipf_indices(len(business_ids), len(new_tips), tip_business_skew, rng)
+    new_tips.set_ref_column('user_id', tip_users, user_ids)
+    new_tips.set_ref_column('business_id', tip_businesses, business_ids)
+    # Update tip compliment count
+    if random_tip_compliments:
+        new_tips.set_column('compliment_count', rng.integers(0, 100, size=len(new_tips)))
+
+    stats = {
+        'tips_per_user': distribution_stats(np.bincount(tip_users, minlength=len(user_ids))),
+        'tips_per_business': distribution_stats(np.bincount(tip_businesses, minlength=len(business_ids))),
+        'friend_degree': distribution_stats(np.diff(friend_offsets)),
+    }
+    return new_users, new_businesses, new_tips, stats
+
+
+def build_delta_batches(users: Dict[str, Any], tips: Dict[str, Any], new_users: RecordStore,
+                        new_businesses: Dict[str, Any], new_tips: RecordStore,
+                        deltas: int, delta_users: int, delta_tips: int, delta_friends: int,
+                        max_friends: int, fixed_friend: bool, random_compliments: bool, random_elite_years: bool,
+                        random_tip_compliments: bool, tip_user_skew: float = 0.0, tip_business_skew: float = 0.0,
+                        friend_skew: float = 0.0) -> List[Dict[str, RecordStore]]:
+    """Generate append-only delta batches on top of a dataset from build_reduced_dataset.
+
+    Each delta has up to delta_users new users (drawn from source users not used yet, befriending
+    any user that exists by then), delta_tips new tips about existing businesses by any user
+    that exists by then, and delta_friends new friend edges between existing users that are not
+    already friends. Returns one {'users', 'tips', 'friends'} dict of RecordStores per delta;
+    friend edges are records with user_id and friend_id.
+    """
+    rng = np.random.default_rng(random.getrandbits(64))
+    user_ids = new_users.column('user_id')
+    business_ids = list(new_businesses)
+    used_users = set(user_ids)
+    unused_user_items = random.sample([item for item in users.items() if item[0] not in used_users],
+                                      min(deltas * delta_users, len(users) - len(used_users)))
+    used_tips = set(new_tips.keys)
+    unused_tip_items = random.sample([item for item in tips.items() if item[0] not in used_tips],
+                                     min(deltas * delta_tips, len(tips) - len(used_tips)))
+
+    # Existing friend edges as sorted source * key_base + target keys, to avoid re-adding them
+    key_base = len(user_ids) + len(unused_user_items)
+    offsets, targets = new_users.list_arrays('friends')
+    edge_keys = np.sort(np.repeat(np.arange(len(user_ids)), np.diff(offsets)) * key_base + targets)
+
+    batches = []
+    for delta in range(deltas):
+        print(f"Generating delta {delta + 1}...")
+        user_items = unused_user_items[delta * delta_users:(delta + 1) * delta_users]
+        first_new_user = len(user_ids)
+        user_ids = user_ids + [user_id for user_id, _ in user_items]
+        delta_user_store = build_user_store(user_items, random_compliments, random_elite_years, rng)
+        offsets, targets = generate_friend_edges(len(user_ids), max_friends, fixed_friend, rng,
+                                                 skew=friend_skew, first_source=first_new_user)
+        delta_user_store.set_list_column('friends', offsets, targets, user_ids)
+        sources = np.repeat(np.arange(first_new_user, len(user_ids)), np.diff(offsets))
+        edge_keys = np.union1d(edge_keys, sources * key_base + targets)
+
+        tip_items = unused_tip_items[delta * delta_tips:(delta + 1) * delta_tips]
+        overwritten = ['user_id', 'business_id'] + (['compliment_count'] if random_tip_compliments else [])
+        delta_tip_store = RecordStore([tip_data for _, tip_data in tip_items], skip=overwritten,
+                                      keys=[tip_id for tip_id, _ in tip_items])
+        delta_tip_store.set_ref_column('user_id', zipf_indices(len(user_ids), len(tip_items), tip_user_skew, rng),
+                                       user_ids)
+        delta_tip_store.set_ref_column('business_id', zipf_indices(
+            len(business_ids), len(tip_items), tip_business_skew, rng), business_ids)
         if random_tip_compliments:
-            new_tip['compliment_count'] = random.randint(0, 99)
-        new_tips[tip_id] = new_tip
+            delta_tip_store.set_column('compliment_count', rng.integers(0, 100, size=len(tip_items)))
+
+        # New edges between existing users: redraw the ones that exist already or repeat within the batch
+        new_keys = np.array([], dtype=np.int64)
+        for _ in range(20):
+            missing = delta_friends - len(new_keys)
+            if missing <= 0 or len(user_ids) < 2:
+                break
+            sources = rng.integers(0, len(user_ids), size=missing)
+            targets = (sources + rng.integers(1, len(user_ids), size=missing)) % len(user_ids)
+            candidates = np.unique(sources * key_base + targets)
+            candidates = candidates[~np.isin(candidates, edge_keys) & ~np.isin(candidates, new_keys)]
+            new_keys = np.concatenate([new_keys, candidates])
+        new_keys = rng.permutation(new_keys[:delta_friends])
+        edge_keys = np.union1d(edge_keys, new_keys)
+        friend_store = RecordStore.empty(len(new_keys))
+        friend_store.set_ref_column('user_id', new_keys // key_base, user_ids)
+        friend_store.set_ref_column('friend_id', new_keys % key_base, user_ids)
+
+        batches.append({'users': delta_user_store, 'tips': delta_tip_store, 'friends': friend_store})
+    return batches
+
+
+def print_skew_stats(stats: Dict[str, Dict[str, float]]):
+    for name, summary in stats.items():
+        if summary:
+            print(f"{name}: mean {summary['mean']:.2f}, median {summary['median']:.0f}, p99 {summary['p99']:.0f}, "
+                  f"max {summary['max']}, top 1% share {summary['top_1_percent_share']:.1%}, "
+                  f"gini {summary['gini']:.3f}")
+
+
+def generate_reduced_dataset(source_users: str, source_businesses: str, source_tips: str,
+                             output_users: str, output_businesses: str, output_tips: str,
+                             max_users: int, max_businesses: int, max_tips: int,
+                             max_friends: int, fixed_friend: bool, random_compliments: bool, random_elite_years: bool,
+                             random_tip_compliments: bool, streaming: bool = False, workers: int = 1,
+                             tip_user_skew: float = 0.0, tip_business_skew: float = 0.0, friend_skew: float = 0.0):
+    """streaming: reservoir-sample the source files in one pass instead of loading them whole
+    workers: number of processes used to parse each source file when not streaming
+    tip_user_skew, tip_business_skew, friend_skew: Zipf exponents for tip authors, tipped businesses
+    and friend counts (0 keeps them uniform)"""
+    print("Loading data files...")
+    try:
+        if streaming:
+            users, num_users = sample_jsonl_file(source_users, max_users)
+            businesses, num_businesses = sample_jsonl_file(source_businesses, max_businesses)
+            tips, num_tips = sample_jsonl_file(source_tips, max_tips)
+        else:
+            users = load_jsonl_file_parallel(source_users, workers)
+            businesses = load_jsonl_file_parallel(source_businesses, workers)
+            tips = load_jsonl_file_parallel(source_tips, workers)
+            num_users, num_businesses, num_tips = len(users), len(businesses), len(tips)
+    except Exception as e:
+        print(f"Error loading files: {str(e)}")
+        return
+
+    new_users, new_businesses, new_tips, stats = build_reduced_dataset(
+        users, businesses, tips, max_users, max_businesses, max_tips, max_friends, fixed_friend,
+        random_compliments, random_elite_years, random_tip_compliments, tip_user_skew, tip_business_skew,
+        friend_skew)
 
     print("Saving reduced datasets...")
     try:
@@ -147,11 +463,266 @@ def generate_reduced_dataset(source_users: str, source_businesses: str, source_t
     # Print statistics
     print("\nDataset statistics:")
     print(f"Original sizes:")
-    print(f"Users: {len(users)}")
-    print(f"Businesses: {len(businesses)}")
-    print(f"Tips: {len(tips)}")
+    print(f"Users: {num_users}")
+    print(f"Businesses: {num_businesses}")
+    print(f"Tips: {num_tips}")
 
     print(f"\nReduced sizes:")
     print(f"Users: {len(new_users)}")
     print(f"Businesses: {len(new_businesses)}")
-    print(f"Tips: {len(new_tips)}")
\ No newline at end of file
+    print(f"Tips: {len(new_tips)}")
+
+    print(f"\nDistributions:")
+    print_skew_stats(stats)
+
+
+def encode_integer_ids(users: RecordStore, businesses: Dict[str, Any], tips: RecordStore,
+                       deltas: List[Dict[str, RecordStore]] = ()) \
+        -> Tuple[RecordStore, Dict[int, Any], RecordStore, List[Tuple[str, int, str]]]:
+    """Replace user and business IDs with dense integer surrogates starting at 1.
+
+    Rewrites user_id, friends, business_id and the tips' user_id/business_id, including those of
+    the delta batches from build_delta_batches (delta users are numbered after the base users).
+    The stores are relabeled in place; businesses are copied because they are shared with the
+    source pool. Returns the encoded records and the (kind, int_id, yelp_id) map.
+    """
+    user_stores = [users] + [delta['users'] for delta in deltas]
+    user_codes = {}
+    for store in user_stores:
+        if not len(store):  # a delta without new users has no user_id column to encode
+            continue
+        first_code = len(user_codes) + 1
+        user_codes.update((user_id, code) for code, user_id in enumerate(store.column('user_id'), first_code))
+        store.set_column('user_id', np.arange(first_code, first_code + len(store)))
+    business_codes = {business_id: code for code, business_id in enumerate(businesses, 1)}
+
+    for store in user_stores:
+        store.relabel('friends', user_codes)
+    encoded_businesses = {}
+    for business_id, business in businesses.items():
+        encoded_businesses[business_codes[business_id]] = {**business, 'business_id': business_codes[business_id]}
+    for store in [tips] + [delta['tips'] for delta in deltas]:
+        store.relabel('user_id', user_codes)
+        store.relabel('business_id', business_codes)
+    for delta in deltas:
+        delta['friends'].relabel('user_id', user_codes)
+        delta['friends'].relabel('friend_id', user_codes)
+
+    id_map = [('user', code, user_id) for user_id, code in user_codes.items()]
+    id_map += [('business', code, business_id) for business_id, code in business_codes.items()]
+    return users, encoded_businesses, tips, id_map
+
+
+def save_id_map(id_map: List[Tuple[str, int, str]], filename: str):
+    """Write the integer ID map as kind<TAB>int_id<TAB>yelp_id lines"""
+    with open(filename, 'w', encoding='utf-8') as f:
+        for kind, code, yelp_id in id_map:
+            f.write(f"{kind}\t{code}\t{yelp_id}\n")
+
+
+# Declarative dataset presets: the output file prefix maps to the generate_reduced_dataset parameters.
+# SF1 is the 50k user benchmark scale; scale_factor_preset derives SF2, SF5, ... from it.
+DATASET_PRESETS: Dict[str, Dict[str, Any]] = {
+    'SF1': {'max_users': 50000, 'max_businesses': 10000, 'max_tips': 20000, 'max_friends': 100,
+            'fixed_friend': True},
+    # The datasets generated by dataset.ipynb
+    'reduced': {'max_users': 50000, 'max_businesses': 10000, 'max_tips': 20000, 'max_friends': 100,
+                'fixed_friend': False},
+    'set1': {'max_users': 50000, 'max_businesses': 10000, 'max_tips': 20000, 'max_friends': 100,
+             'fixed_friend': True},
+    'set2': {'max_users': 100000, 'max_businesses': 20000, 'max_tips': 40000, 'max_friends': 100,
+             'fixed_friend': True},
+    'set3': {'max_users': 100000, 'max_businesses': 20000, 'max_tips': 40000, 'max_friends': 300,
+             'fixed_friend': True},
+}
+
+# int_ids: replace user/business IDs with integer surrogates and write <prefix>_id_map.tsv
+# *_skew: Zipf exponents for tip authors, tipped businesses and friend counts (0 is uniform)
+# deltas: number of append batches written as <prefix>_delta<k>_users/_tips/_friends.json, each with
+# delta_users new users, delta_tips new tips and delta_friends new friend edges
+PRESET_DEFAULTS: Dict[str, Any] = {
+    'random_compliments': True, 'random_elite_years': True, 'random_tip_compliments': True,
+    'int_ids': False, 'tip_user_skew': 0.0, 'tip_business_skew': 0.0, 'friend_skew': 0.0,
+    'deltas': 0, 'delta_users': 0, 'delta_tips': 0, 'delta_friends': 0,
+}
+
+DELTA_PARAMETERS = ('deltas', 'delta_users', 'delta_tips', 'delta_friends')
+
+
+def scale_factor_preset(scale_factor: float) -> Dict[str, Any]:
+    """Scale the SF1 entity counts by scale_factor, keeping the friend fan-out per user"""
+    base = DATASET_PRESETS['SF1']
+    preset = dict(base)
+    for key in ('max_users', 'max_businesses', 'max_tips'):
+        preset[key] = int(base[key] * scale_factor)
+    return preset
+
+
+def resolve_preset(name: str) -> Dict[str, Any]:
+    """Look up a named preset, or build an SF<n> scale-factor preset such as SF2 or SF0.5"""
+    if name in DATASET_PRESETS:
+        preset = DATASET_PRESETS[name]
+    else:
+        match = re.fullmatch(r'SF(\d+(?:\.\d+)?)', name)
+        if not match:
+            raise ValueError(f"Unknown dataset preset: {name}")
+        preset = scale_factor_preset(float(match.group(1)))
+    return {**PRESET_DEFAULTS, **preset}
+
+
+# Bump when a change to the generator makes previously cached datasets stale
+GENERATOR_VERSION = 2
+
+
+def file_checksum(filename: str) -> str:
+    """SHA-256 of a file, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_fingerprint(filename: str, previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Size, mtime and checksum of a source file; the checksum recorded in previous is reused if
+    size and mtime still match, so multi-GB sources are not rehashed on every run"""
+    stat = os.stat(filename)
+    fingerprint = {'path': os.path.abspath(filename), 'size': stat.st_size, 'mtime': stat.st_mtime}
+    if previous and previous.get('size') == stat.st_size and previous.get('mtime') == stat.st_mtime:
+        fingerprint['sha256'] = previous['sha256']
+    else:
+        fingerprint['sha256'] = file_checksum(filename)
+    return fingerprint
+
+
+def load_manifest(filename: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def manifest_is_current(manifest: Optional[Dict[str, Any]], sources: Dict[str, Dict[str, Any]],
+                        parameters: Dict[str, Any], seed: Optional[int]) -> bool:
+    """True if manifest describes outputs generated from the same sources, parameters and seed,
+    and every output file still has the recorded checksum"""
+    if manifest is None or seed is None:
+        return False
+    if (manifest.get('generator_version') != GENERATOR_VERSION or manifest.get('seed') != seed
+            or manifest.get('parameters') != parameters):
+        return False
+    if any(manifest['sources'].get(kind, {}).get('sha256') != source['sha256'] for kind, source in sources.items()):
+        return False
+    for output in manifest['outputs'].values():
+        if not os.path.exists(output['path']) or file_checksum(output['path']) != output['sha256']:
+            return False
+    return True
+
+
+def generate_preset_datasets(source_users: str, source_businesses: str, source_tips: str,
+                             presets: Dict[str, Dict[str, Any]], output_dir: str = '.',
+                             seed: Optional[int] = None, streaming: bool = False,
+                             workers: int = 1, use_cache: bool = True) -> Dict[str, Dict[str, int]]:
+    """Generate every preset from a single parse of the source files.
+
+    presets maps an output prefix to generate_reduced_dataset parameters (see resolve_preset);
+    each preset is written to <output_dir>/<prefix>_users.json, _businesses.json and _tips.json,
+    along with <prefix>_manifest.json recording the source checksums, parameters, seed, record
+    counts and output checksums.
+    With streaming, one reservoir sample as large as the biggest preset is shared by all presets.
+    Each preset is seeded from (seed, prefix), so without streaming its output does not depend
+    on which other presets are generated alongside it.
+    With use_cache and a seed, presets whose manifest matches the current inputs are reused, and
+    the sources are not parsed at all if every preset is cached.
+    Returns the record counts of every preset.
+    """
+    presets = {name: {**PRESET_DEFAULTS, **params} for name, params in presets.items()}
+    pool_sizes = {'users': max(p['max_users'] + p['deltas'] * p['delta_users'] for p in presets.values()),
+                  'businesses': max(p['max_businesses'] for p in presets.values()),
+                  'tips': max(p['max_tips'] + p['deltas'] * p['delta_tips'] for p in presets.values())}
+
+    os.makedirs(output_dir, exist_ok=True)
+    manifests = {name: load_manifest(os.path.join(output_dir, f"{name}_manifest.json")) for name in presets}
+    source_files = {'users': source_users, 'businesses': source_businesses, 'tips': source_tips}
+    sources = {}
+    for kind, filename in source_files.items():
+        previous = next((m['sources'][kind] for m in manifests.values()
+                         if m and m['sources'].get(kind, {}).get('path') == os.path.abspath(filename)), None)
+        sources[kind] = source_fingerprint(filename, previous)
+
+    stats = {}
+    parameters = {}
+    for name, params in presets.items():
+        # In streaming mode the outputs also depend on the size of the shared reservoir sample
+        parameters[name] = {**params, 'streaming': streaming, 'pool_sizes': pool_sizes if streaming else None}
+        if use_cache and manifest_is_current(manifests[name], sources, parameters[name], seed):
+            print(f"Dataset {name} is up to date, reusing {output_dir}")
+            stats[name] = manifests[name]['counts']
+    stale = [name for name in presets if name not in stats]
+    if not stale:
+        return stats
+
+    print("Loading data files...")
+    if streaming:
+        if seed is not None:
+            random.seed(f"{seed}-pool")
+        users, num_users = sample_jsonl_file(source_users, pool_sizes['users'])
+        businesses, num_businesses = sample_jsonl_file(source_businesses, pool_sizes['businesses'])
+        tips, num_tips = sample_jsonl_file(source_tips, pool_sizes['tips'])
+    else:
+        users = load_jsonl_file_parallel(source_users, workers)
+        businesses = load_jsonl_file_parallel(source_businesses, workers)
+        tips = load_jsonl_file_parallel(source_tips, workers)
+        num_users, num_businesses, num_tips = len(users), len(businesses), len(tips)
+    print(f"Source sizes: {num_users} users, {num_businesses} businesses, {num_tips} tips")
+
+    for name in stale:
+        print(f"\nGenerating dataset {name}...")
+        if seed is not None:
+            random.seed(f"{seed}-{name}")
+        params = dict(presets[name])
+        int_ids = params.pop('int_ids')
+        delta_params = {key: params.pop(key) for key in DELTA_PARAMETERS}
+        new_users, new_businesses, new_tips, skew_stats = build_reduced_dataset(users, businesses, tips, **params)
+        print_skew_stats(skew_stats)
+        deltas = []
+        if delta_params['deltas']:
+            del params['max_users'], params['max_businesses'], params['max_tips']
+            deltas = build_delta_batches(users, tips, new_users, new_businesses, new_tips, **delta_params, **params)
+
+        print("Saving reduced datasets...")
+        outputs = {}
+        if int_ids:
+            new_users, new_businesses, new_tips, id_map = encode_integer_ids(new_users, new_businesses, new_tips,
+                                                                             deltas)
+            id_map_file = os.path.join(output_dir, f"{name}_id_map.tsv")
+            save_id_map(id_map, id_map_file)
+            outputs['id_map'] = {'path': os.path.abspath(id_map_file), 'sha256': file_checksum(id_map_file)}
+        files = [('users', new_users), ('businesses', new_businesses), ('tips', new_tips)]
+        for index, delta in enumerate(deltas, 1):
+            files += [(f"delta{index}_{kind}", records) for kind, records in delta.items()]
+        for kind, records in files:
+            output_file = os.path.join(output_dir, f"{name}_{kind}.json")
+            save_jsonl_file(records, output_file)
+            outputs[kind] = {'path': os.path.abspath(output_file), 'sha256': file_checksum(output_file)}
+        stats[name] = {'users': len(new_users), 'businesses': len(new_businesses), 'tips': len(new_tips)}
+        if deltas:
+            stats[name]['deltas'] = [{kind: len(records) for kind, records in delta.items()} for delta in deltas]
+
+        manifest = {
+            'generator_version': GENERATOR_VERSION,
+            'name': name,
+            'seed': seed,
+            'parameters': parameters[name],
+            'sources': sources,
+            'source_counts': {'users': num_users, 'businesses': num_businesses, 'tips': num_tips},
+            'counts': stats[name],
+            'skew_stats': skew_stats,
+            'outputs': outputs,
+        }
+        with open(os.path.join(output_dir, f"{name}_manifest.json"), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        print(f"{name}: {stats[name]['users']} users, {stats[name]['businesses']} businesses, "
+              f"{stats[name]['tips']} tips")
+    return {name: stats[name] for name in presets}
@@ -0,0 +1,50 @@
+import argparse
+
+from datasetUtils import generate_preset_datasets, resolve_preset
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate several reduced Yelp datasets from a single parse of the source files")
+    parser.add_argument('--users', required=True, help="source user JSONL file")
+    parser.add_argument('--businesses', required=True, help="source business JSONL file")
+    parser.add_argument('--tips', required=True, help="source tip JSONL file")
+    parser.add_argument('--presets', nargs='+', default=['SF1', 'SF2', 'SF5'],
+                        help="preset names (SF<n>, reduced, set1, set2, set3); also used as output prefixes")
+    parser.add_argument('--output-dir', default='.', help="directory for the generated files")
+    parser.add_argument('--seed', type=int, default=None, help="random seed for reproducible datasets")
+    parser.add_argument('--streaming', action='store_true',
+                        help="reservoir-sample the sources instead of loading them whole")
+    parser.add_argument('--workers', type=int, default=1, help="processes used to parse each source file")
+    parser.add_argument('--int-ids', action='store_true',
+                        help="replace user/business IDs with integer surrogates and write <preset>_id_map.tsv")
+    parser.add_argument('--tip-user-skew', type=float, default=0.0,
+                        help="Zipf exponent for how tips are spread over users (0 is uniform)")
+    parser.add_argument('--tip-business-skew', type=float, default=0.0,
+                        help="Zipf exponent for how tips are spread over businesses (0 is uniform)")
+    parser.add_argument('--friend-skew', type=float, default=0.0,
+                        help="power-law exponent for friend counts when friends are not fixed (0 is uniform)")
+    parser.add_argument('--deltas', type=int, default=0,
+                        help="number of append batches to generate after each preset")
+    parser.add_argument('--delta-users', type=int, default=0, help="new users per append batch")
+    parser.add_argument('--delta-tips', type=int, default=0, help="new tips per append batch")
+    parser.add_argument('--delta-friends', type=int, default=0, help="new friend edges per append batch")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="regenerate every preset even if its manifest matches the current inputs")
+    args = parser.parse_args()
+
+    presets = {name: resolve_preset(name) for name in args.presets}
+    for preset in presets.values():
+        preset['int_ids'] = preset['int_ids'] or args.int_ids
+        preset['tip_user_skew'] = args.tip_user_skew or preset['tip_user_skew']
+        preset['tip_business_skew'] = args.tip_business_skew or preset['tip_business_skew']
+        preset['friend_skew'] = args.friend_skew or preset['friend_skew']
+        for key in ('deltas', 'delta_users', 'delta_tips', 'delta_friends'):
+            preset[key] = getattr(args, key) or preset[key]
+    generate_preset_datasets(args.users, args.businesses, args.tips, presets, output_dir=args.output_dir,
+                             seed=args.seed, streaming=args.streaming, workers=args.workers,
+                             use_cache=not args.no_cache)
+
+
+if __name__ == "__main__":
+    main()
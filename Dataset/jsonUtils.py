@@ -0,0 +1,53 @@
+import json
+import re
+from typing import Any
+
+# Use the fastest JSON backend that is installed, falling back to the standard library
+try:
+    import orjson
+
+    def loads(json_str: str) -> Any:
+        return orjson.loads(json_str)
+
+    def dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode('utf-8')
+
+    JSON_BACKEND = 'orjson'
+except ImportError:
+    try:
+        import ujson
+
+        def loads(json_str: str) -> Any:
+            return ujson.loads(json_str)
+
+        def dumps(obj: Any) -> str:
+            return ujson.dumps(obj, ensure_ascii=False)
+
+        JSON_BACKEND = 'ujson'
+    except ImportError:
+        loads = json.loads
+
+        def dumps(obj: Any) -> str:
+            return json.dumps(obj)
+
+        JSON_BACKEND = 'json'
+
+
+def clean_json_string(json_str: str) -> str:
+    # Remove // comments
+    json_str = re.sub(r'//.*$', '', json_str)
+    # Remove any trailing commas before closing braces/brackets
+    json_str = re.sub(r',(\s*[}\]])', r'\1', json_str)
+    return json_str
+
+
+def decode_json_line(line: str) -> Any:
+    """Decode one JSON line, stripping comments and trailing commas only if the strict parse fails.
+
+    Raises json.JSONDecodeError if the line cannot be parsed even after cleaning.
+    """
+    try:
+        return loads(line)
+    except ValueError:
+        # The stdlib parser also accepts NaN/Infinity and big integers that faster backends reject
+        return json.loads(clean_json_string(line))
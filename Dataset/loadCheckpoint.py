@@ -0,0 +1,77 @@
+import json
+import os
+import time
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+
+def iter_lines(filename: str, start: int = 0) -> Iterator[Tuple[int, str]]:
+    """Yield (offset after the line, decoded line) for every line of a file from byte offset start"""
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        offset = start
+        for line in f:
+            offset += len(line)
+            yield offset, line.decode('utf-8')
+
+
+class LoadCheckpoint:
+    """Progress of a database load through one input file, persisted as a small JSON file.
+
+    The loader calls save() after every committed batch with the byte offset just past the batch
+    and the batch sequence number; a rerun with the same checkpoint file resumes from that offset.
+    The checkpoint is discarded if the input file changed size or modification time since then;
+    the discarded state is kept in stale, so the loader can clean up after the abandoned run.
+    Loaders add their own keys to state (e.g. the phase of a multi-pass load). Loaders that commit
+    many small units call save_if_due() instead, which writes at most every interval seconds.
+    """
+
+    def __init__(self, path: str, source: str, interval: float = 5.0):
+        self.path = path
+        self.interval = interval
+        self.saved_at = time.monotonic()
+        stat = os.stat(source)
+        fingerprint = {'source': os.path.abspath(source), 'size': stat.st_size, 'mtime': stat.st_mtime}
+        self.state: Dict[str, Any] = {}
+        self.stale: Optional[Dict[str, Any]] = None
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            if all(saved.get(key) == value for key, value in fingerprint.items()):
+                self.state = saved
+            else:
+                self.stale = saved
+        self.resumed = bool(self.state)
+        if not self.state:
+            self.state = dict(fingerprint, offset=0, batch=0, complete=False)
+
+    @property
+    def offset(self) -> int:
+        return self.state['offset']
+
+    @property
+    def batch(self) -> int:
+        return self.state['batch']
+
+    @property
+    def complete(self) -> bool:
+        return self.state['complete']
+
+    def save(self, offset: Optional[int] = None, batch: Optional[int] = None, **state):
+        """Record progress; written to a temporary file first so a crash never leaves a torn checkpoint"""
+        if offset is not None:
+            self.state['offset'] = offset
+        if batch is not None:
+            self.state['batch'] = batch
+        self.state.update(state)
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+        os.replace(temporary, self.path)
+        self.saved_at = time.monotonic()
+
+    def save_if_due(self, offset: Optional[int] = None, batch: Optional[int] = None, **state):
+        if time.monotonic() - self.saved_at >= self.interval:
+            self.save(offset, batch, **state)
+
+    def finish(self):
+        self.save(complete=True)
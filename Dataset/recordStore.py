@@ -0,0 +1,111 @@
+from typing import Dict, List, Any, Iterator, Sequence, Optional, Tuple
+
+import numpy as np
+
+# Placeholder for a field that a record does not have; such fields are left out when materializing
+_MISSING = object()
+
+
+class RecordStore:
+    """Columnar store for generated records.
+
+    Integer and float fields are kept in typed NumPy arrays. String fields, and fields that
+    reference other records, are kept as integer indices into a label table, so repeated IDs
+    and strings are stored once. List-of-reference fields (friends, elite years) are kept as a
+    CSR pair of offsets and target indices. Anything else is kept as a plain Python list.
+    Records are only built as dicts when they are read back through values().
+    """
+
+    def __init__(self, records: Sequence[Dict[str, Any]], skip: Sequence[str] = (),
+                 keys: Optional[List[Any]] = None):
+        """skip: fields the caller is about to overwrite; they keep their position but are not copied
+        keys: optional source keys of the records (e.g. their IDs in the loaded source file)"""
+        self.size = len(records)
+        self.keys = keys
+        self.fields: List[str] = []
+        self.columns: Dict[str, Dict[str, Any]] = {}
+
+        for record in records:
+            for field in record:
+                if field not in self.columns:
+                    self.fields.append(field)
+                    self.columns[field] = None
+        for field in self.fields:
+            if field in skip:
+                self.columns[field] = {'kind': 'object', 'values': [_MISSING] * self.size}
+            else:
+                self.columns[field] = self._build_column([record.get(field, _MISSING) for record in records])
+
+    @classmethod
+    def empty(cls, size: int) -> 'RecordStore':
+        """A store of size records without fields, to be filled with set_*column"""
+        store = cls([])
+        store.size = size
+        return store
+
+    def _build_column(self, values: List[Any]) -> Dict[str, Any]:
+        types = {type(value) for value in values}
+        if types == {int}:
+            return {'kind': 'array', 'values': np.array(values, dtype=np.int64)}
+        if types == {float}:
+            return {'kind': 'array', 'values': np.array(values, dtype=np.float64)}
+        if types == {str}:
+            labels, indices = np.unique(np.array(values, dtype=object), return_inverse=True)
+            return {'kind': 'ref', 'indices': indices.astype(np.int32), 'labels': labels}
+        return {'kind': 'object', 'values': values}
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _add_field(self, name: str, column: Dict[str, Any]):
+        if name not in self.columns:
+            self.fields.append(name)
+        self.columns[name] = column
+
+    def set_column(self, name: str, values: np.ndarray):
+        """Overwrite (or add) a numeric field for every record at once"""
+        self._add_field(name, {'kind': 'array', 'values': np.asarray(values)})
+
+    def set_ref_column(self, name: str, indices: np.ndarray, labels: Sequence[Any]):
+        """Overwrite (or add) a field whose value for record i is labels[indices[i]]"""
+        self._add_field(name, {'kind': 'ref', 'indices': np.asarray(indices),
+                               'labels': np.asarray(labels, dtype=object)})
+
+    def set_list_column(self, name: str, offsets: np.ndarray, targets: np.ndarray, labels: Sequence[Any]):
+        """Overwrite (or add) a list field: record i gets labels[targets[offsets[i]:offsets[i + 1]]]"""
+        self._add_field(name, {'kind': 'list', 'offsets': np.asarray(offsets), 'targets': np.asarray(targets),
+                               'labels': np.asarray(labels, dtype=object)})
+
+    def relabel(self, name: str, mapping: Dict[Any, Any]):
+        """Translate the labels of a reference or list field through mapping, without touching the records"""
+        column = self.columns[name]
+        column['labels'] = np.array([mapping[label] for label in column['labels']], dtype=object)
+
+    def list_arrays(self, name: str) -> Tuple[np.ndarray, np.ndarray]:
+        """The (offsets, targets) CSR arrays of a list field"""
+        column = self.columns[name]
+        return column['offsets'], column['targets']
+
+    def column(self, name: str) -> List[Any]:
+        """Values of one field for every record"""
+        return self._slice(self.columns[name], 0, self.size)
+
+    def _slice(self, column: Dict[str, Any], start: int, end: int) -> List[Any]:
+        kind = column['kind']
+        if kind == 'array':
+            return column['values'][start:end].tolist()
+        if kind == 'ref':
+            return column['labels'][column['indices'][start:end]].tolist()
+        if kind == 'list':
+            offsets = column['offsets'][start:end + 1] - column['offsets'][start]
+            flat = column['labels'][column['targets'][column['offsets'][start]:column['offsets'][end]]].tolist()
+            return [flat[offsets[i]:offsets[i + 1]] for i in range(end - start)]
+        return column['values'][start:end]
+
+    def values(self, chunk_size: int = 10000) -> Iterator[Dict[str, Any]]:
+        """Materialize the records one chunk of rows at a time"""
+        for start in range(0, self.size, chunk_size):
+            end = min(start + chunk_size, self.size)
+            columns = [self._slice(self.columns[field], start, end) for field in self.fields]
+            for row in zip(*columns):
+                yield {field: value for field, value in zip(self.fields, row) if value is not _MISSING}
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from datasetUtils import generate_friend_edges
+
+
+def rows(offsets, targets):
+    return [targets[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+def check_rows(offsets, targets, num_users, first_source=0):
+    assert len(offsets) == num_users - first_source + 1
+    assert offsets[0] == 0 and offsets[-1] == len(targets)
+    for user, friends in enumerate(rows(offsets, targets), first_source):
+        assert user not in friends
+        assert len(np.unique(friends)) == len(friends)
+        assert np.all((friends >= 0) & (friends < num_users))
+
+
+@pytest.mark.parametrize('skew', [0.0, 1.5])
+def test_random_degrees(skew):
+    offsets, targets = generate_friend_edges(500, 50, False, np.random.default_rng(1), skew=skew)
+    check_rows(offsets, targets, 500)
+    assert np.all(np.diff(offsets) <= 50)
+
+
+def test_fixed_degrees():
+    offsets, targets = generate_friend_edges(300, 20, True, np.random.default_rng(2))
+    check_rows(offsets, targets, 300)
+    assert np.all(np.diff(offsets) == 20)
+
+
+@pytest.mark.parametrize('num_users', [2, 5, 30])
+def test_fixed_degrees_capped_at_all_other_users(num_users):
+    offsets, targets = generate_friend_edges(num_users, 100, True, np.random.default_rng(3))
+    check_rows(offsets, targets, num_users)
+    assert np.all(np.diff(offsets) == num_users - 1)
+    for user, friends in enumerate(rows(offsets, targets)):
+        assert sorted(friends) == [other for other in range(num_users) if other != user]
+
+
+def test_dense_rows():
+    # Degrees above half the users are sampled directly rather than redrawn on collisions
+    offsets, targets = generate_friend_edges(40, 35, True, np.random.default_rng(4))
+    check_rows(offsets, targets, 40)
+    assert np.all(np.diff(offsets) == 35)
+
+
+def test_first_source():
+    offsets, targets = generate_friend_edges(200, 10, True, np.random.default_rng(5), first_source=150)
+    check_rows(offsets, targets, 200, first_source=150)
+    assert np.all(np.diff(offsets) == 10)
+    # New users befriend existing ones as well
+    assert np.any(targets < 150)
+
+
+def test_no_friends():
+    for num_users, max_friends in [(0, 10), (1, 10), (100, 0)]:
+        offsets, targets = generate_friend_edges(num_users, max_friends, True, np.random.default_rng(6))
+        assert len(targets) == 0
+        assert np.all(offsets == 0)
+
+
+def test_first_source_at_the_end():
+    offsets, targets = generate_friend_edges(100, 10, False, np.random.default_rng(7), first_source=100)
+    assert list(offsets) == [0]
+    assert len(targets) == 0
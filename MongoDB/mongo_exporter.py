@@ -1,15 +1,72 @@
-import json
 import logging
+import os
+import shutil
 import time
 import csv
-from typing import Dict, Any, List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional
 from pathlib import Path
 
 import pymongo
 
 
+def flatten_document(document: Dict, parent_key: str = '', sep: str = '_') -> Dict:
+    items: List = []
+
+    for key, value in document.items():
+        new_key = f"{parent_key}{sep}{key}" if parent_key else key
+
+        if isinstance(value, dict):
+            items.extend(flatten_document(value, new_key, sep).items())
+        elif isinstance(value, list):
+            items.append((new_key, str(value)))
+        else:
+            items.append((new_key, value))
+
+    return dict(items)
+
+
+# Client of an export_to_csv_parallel worker process; MongoClient must not be shared across fork
+_worker_client = None
+
+
+def _init_export_worker(db_uri: str):
+    global _worker_client
+    _worker_client = pymongo.MongoClient(db_uri)
+
+
+def _export_range(db_name: str, collection_name: str, headers: List[str], lower, upper, part_path: str,
+                  batch_size: int) -> Dict[str, Any]:
+    """Write the documents with lower <= _id < upper (None: unbounded) to a CSV file of their own"""
+    start_time = time.time()
+    id_range = {}
+    if lower is not None:
+        id_range['$gte'] = lower
+    if upper is not None:
+        id_range['$lt'] = upper
+    cursor = _worker_client[db_name][collection_name].find({'_id': id_range} if id_range else {},
+                                                          sort=[('_id', pymongo.ASCENDING)], batch_size=batch_size)
+    doc_count = 0
+    with open(part_path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=headers)
+        writer.writeheader()
+        batch = []
+        for document in cursor:
+            batch.append(flatten_document(document))
+            if len(batch) >= batch_size:
+                writer.writerows(batch)
+                doc_count += len(batch)
+                batch = []
+        if batch:
+            writer.writerows(batch)
+            doc_count += len(batch)
+    return {'pid': os.getpid(), 'part_file': part_path, 'documents': doc_count, 'time': time.time() - start_time}
+
+
 class MongoDBExporter:
     def __init__(self, db_uri: str, db_name: str):
+        self.db_uri = db_uri
+        self.db_name = db_name
         self.client = pymongo.MongoClient(db_uri)
         self.db = self.client[db_name]
         self.setup_logging()
@@ -25,7 +82,12 @@ class MongoDBExporter:
         )
         self.logger = logging.getLogger(__name__)
 
-    def export_to_csv(self, collection_name: str, output_path: str, batch_size: int = 1000) -> Dict[str, Any]:
+    def export_to_csv(self, collection_name: str, output_path: str, batch_size: int = 1000,
+                      workers: int = 1, concatenate: bool = True) -> Dict[str, Any]:
+        """workers > 1: export _id ranges in parallel, see export_to_csv_parallel"""
+        if workers > 1:
+            return self.export_to_csv_parallel(collection_name, output_path, workers, batch_size=batch_size,
+                                               concatenate=concatenate)
         start_time = time.time()
         collection = self.db[collection_name]
         doc_count = 0
@@ -72,20 +134,90 @@ class MongoDBExporter:
             'output_file': output_path
         }
 
-    def _flatten_document(self, document: Dict, parent_key: str = '', sep: str = '_') -> Dict:
-        items: List = []
+    def id_boundaries(self, collection_name: str, parts: int, samples_per_part: int = 100) -> List[Any]:
+        """_id values that cut the collection into parts ranges of about equal size, taken from a $sample
+        of the _ids (like the splitVector command, but without its privileges or a sharded cluster)"""
+        collection = self.db[collection_name]
+        sample_size = min(parts * samples_per_part, collection.estimated_document_count())
+        if parts <= 1 or sample_size == 0:
+            return []
+        ids = sorted(document['_id'] for document in
+                     collection.aggregate([{"$sample": {"size": sample_size}}, {"$project": {"_id": 1}}]))
+        boundaries = []
+        for i in range(1, parts):
+            boundary = ids[len(ids) * i // parts]
+            if not boundaries or boundary != boundaries[-1]:
+                boundaries.append(boundary)
+        return boundaries
 
-        for key, value in document.items():
-            new_key = f"{parent_key}{sep}{key}" if parent_key else key
+    def export_to_csv_parallel(self, collection_name: str, output_path: str, workers: Optional[int] = None,
+                               parts: Optional[int] = None, batch_size: int = 1000,
+                               concatenate: bool = True) -> Dict[str, Any]:
+        """Export a collection with a pool of worker processes, each writing one _id range to its own
+        part file (<output_path>.part<i>, with a header line). The ranges come from id_boundaries and
+        are read in _id order, so with concatenate the parts are joined into output_path in _id order
+        and removed. parts defaults to 4 per worker, so a slow range does not hold up the whole export.
+        """
+        start_time = time.time()
+        workers = workers or os.cpu_count() or 1
+        parts = parts or 4 * workers
+        first_doc = self.db[collection_name].find_one()
+        if not first_doc:
+            self.logger.error(f"No documents found in collection {collection_name}")
+            return
+        headers = self._get_flattened_headers(first_doc)
+
+        boundaries = self.id_boundaries(collection_name, parts)
+        ranges = list(zip([None] + boundaries, boundaries + [None]))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_export_worker,
+                                 initargs=(self.db_uri,)) as executor:
+            futures = [executor.submit(_export_range, self.db_name, collection_name, headers, lower, upper,
+                                       f"{output_path}.part{i:03d}", batch_size)
+                       for i, (lower, upper) in enumerate(ranges)]
+            results = [future.result() for future in futures]
+        export_time = time.time() - start_time
+
+        part_files = [result['part_file'] for result in results]
+        if concatenate:
+            with open(output_path, 'wb') as output:
+                for i, part_file in enumerate(part_files):
+                    with open(part_file, 'rb') as part:
+                        if i > 0:
+                            part.readline()  # header
+                        shutil.copyfileobj(part, output, 16 * 1024 * 1024)
+                    os.remove(part_file)
+
+        per_worker: Dict[int, Dict[str, Any]] = {}
+        for result in results:
+            worker = per_worker.setdefault(result['pid'], {'documents': 0, 'parts': 0, 'time': 0.0})
+            worker['documents'] += result['documents']
+            worker['parts'] += 1
+            worker['time'] += result['time']
+        for worker in per_worker.values():
+            worker['documents_per_second'] = worker['documents'] / worker['time'] if worker['time'] else 0.0
+
+        doc_count = sum(result['documents'] for result in results)
+        final_time = time.time() - start_time
+        self.logger.info(
+            f"Export completed: {doc_count:,} documents in {final_time:.2f} seconds " +
+            f"({doc_count / final_time:.2f} documents/second, {len(ranges)} parts, {len(per_worker)} workers" +
+            (f", {final_time - export_time:.2f} seconds concatenating)" if concatenate else ")"))
+        for pid, worker in per_worker.items():
+            self.logger.info(f"  worker {pid}: {worker['documents']:,} documents in {worker['parts']} parts, " +
+                             f"{worker['documents_per_second']:.2f} documents/second")
 
-            if isinstance(value, dict):
-                items.extend(self._flatten_document(value, new_key, sep).items())
-            elif isinstance(value, list):
-                items.append((new_key, str(value)))
-            else:
-                items.append((new_key, value))
+        return {
+            'collection': collection_name,
+            'total_documents': doc_count,
+            'total_time': final_time,
+            'concatenate_time': final_time - export_time,
+            'output_file': output_path if concatenate else None,
+            'part_files': [] if concatenate else part_files,
+            'workers': list(per_worker.values())
+        }
 
-        return dict(items)
+    def _flatten_document(self, document: Dict, parent_key: str = '', sep: str = '_') -> Dict:
+        return flatten_document(document, parent_key, sep)
 
     def _get_flattened_headers(self, document: Dict) -> List[str]:
         return list(self._flatten_document(document).keys())
@@ -96,19 +228,26 @@ def main():
     DB_NAME = "yelp_db"
     OUTPUT_DIR = Path("../")
     OUTPUT_DIR.mkdir(exist_ok=True)
+    WORKERS = 1  # > 1 exports _id ranges in parallel with export_to_csv_parallel
+    CONCATENATE = True  # join the part files of a parallel export into one CSV
 
     exporter = MongoDBExporter(MONGODB_URI, DB_NAME)
 
     try:
         metrics = exporter.export_to_csv(
             collection_name="user",
-            output_path=str(OUTPUT_DIR / "mongo_users.csv")
+            output_path=str(OUTPUT_DIR / "mongo_users.csv"),
+            workers=WORKERS,
+            concatenate=CONCATENATE
         )
 
         print("\nExport Summary:")
         print(f"Total documents: {metrics['total_documents']:,}")
         print(f"Total time: {metrics['total_time']:.2f} seconds")
-        print(f"Output file: {metrics['output_file']}")
+        if metrics.get('part_files'):
+            print(f"Part files: {len(metrics['part_files'])} ({metrics['part_files'][0]}, ...)")
+        else:
+            print(f"Output file: {metrics['output_file']}")
 
     except Exception as e:
         print(f"Export failed: {e}")
@@ -3,6 +3,18 @@ from collections import defaultdict
 import pymongo
 import time
 
+from mongodb_bulkload import MongoDBLoader
+
+
+def set_indexes(indexed: bool):
+    """Build (indexed) or drop (not indexed) the loader's declared indexes before timing the queries"""
+    loader = MongoDBLoader("mongodb://localhost:27017/", "yelp_db")
+    if indexed:
+        loader.build_indexes()
+    else:
+        loader.drop_indexes()
+    loader.client.close()
+
 
 def find_top_rated_restaurant_in_nashville():
     MONGODB_URI = "mongodb://localhost:27017/"
@@ -123,10 +135,11 @@ def find_user_reviews(user_id):
     client.close()
 
 
-def calculate_users_review_count():
+def calculate_users_review_count(from_rollups=False):
+    """from_rollups: read the user_tip_stats rollup of mongo_rollups.py instead of regrouping every tip"""
     MONGODB_URI = "mongodb://localhost:27017/"
     DB_NAME = "yelp_db"
-    COLLECTION_NAME = "tip"
+    COLLECTION_NAME = "user_tip_stats" if from_rollups else "tip"
 
     client = pymongo.MongoClient(MONGODB_URI)
     db = client[DB_NAME]
@@ -134,15 +147,25 @@ def calculate_users_review_count():
 
     start_time = time.time()
 
-    pipeline = [
-        {
+    if from_rollups:
+        group = {
+            "$project": {
+                "review_count": "$tip_count",
+                "avg_compliments": {"$divide": ["$total_compliments", "$tip_count"]},
+                "latest_review": "$latest_tip"
+            }
+        }
+    else:
+        group = {
             "$group": {
                 "_id": "$user_id",
                 "review_count": {"$sum": 1},
                 "avg_compliments": {"$avg": "$compliment_count"},
                 "latest_review": {"$max": "$date"}
             }
-        },
+        }
+    pipeline = [
+        group,
         {
             "$sort": {"review_count": -1}
         }
@@ -236,10 +259,11 @@ def find_business_pairs_tipped_by_same_people():
     client.close()
 
 
-def find_top_users_with_most_tips_and_compliments():
+def find_top_users_with_most_tips_and_compliments(from_rollups=False):
+    """from_rollups: read the user_tip_stats rollup of mongo_rollups.py instead of regrouping every tip"""
     MONGODB_URI = "mongodb://localhost:27017/"
     DB_NAME = "yelp_db"
-    COLLECTION_NAME = "tip"
+    COLLECTION_NAME = "user_tip_stats" if from_rollups else "tip"
 
     client = pymongo.MongoClient(MONGODB_URI)
     db = client[DB_NAME]
@@ -247,8 +271,10 @@ def find_top_users_with_most_tips_and_compliments():
 
     start_time = time.time()
 
-    pipeline = [
-        {
+    if from_rollups:
+        group = {"$addFields": {"avg_compliments": {"$divide": ["$total_compliments", "$tip_count"]}}}
+    else:
+        group = {
             "$group": {
                 "_id": "$user_id",
                 "tip_count": {"$sum": 1},
@@ -256,7 +282,9 @@ def find_top_users_with_most_tips_and_compliments():
                 "avg_compliments": {"$avg": "$compliment_count"},
                 "latest_tip": {"$max": "$date"}
             }
-        },
+        }
+    pipeline = [
+        group,
         {
             "$match": {
                 "total_compliments": {"$gt": 100}
@@ -290,7 +318,28 @@ def find_top_users_with_most_tips_and_compliments():
     client.close()
 
 
-def find_top_business_categories_by_compliments():
+def business_category_stages(denormalized):
+    """Stages giving every tip one row per category of its business, and the field paths of the category
+    and business name. denormalized: the tips were loaded with MongoDBLoader.load_tips_denormalized and
+    carry categories and business_name themselves, so no $lookup into business is needed."""
+    if denormalized:
+        return [{"$unwind": "$categories"}], "$categories", "$business_name"
+    stages = [
+        {
+            "$lookup": {
+                "from": "business",
+                "localField": "business_id",
+                "foreignField": "business_id",
+                "as": "business_info"
+            }
+        },
+        {"$unwind": "$business_info"},
+        {"$unwind": "$business_info.categories"},
+    ]
+    return stages, "$business_info.categories", "$business_info.name"
+
+
+def find_top_business_categories_by_compliments(denormalized=False):
     MONGODB_URI = "mongodb://localhost:27017/"
     DB_NAME = "yelp_db"
     COLLECTION_NAME = "tip"
@@ -302,20 +351,11 @@ def find_top_business_categories_by_compliments():
 
     start_time = time.time()
 
-    pipeline = [
-        {
-            "$lookup": {
-                "from": "business",
-                "localField": "business_id",
-                "foreignField": "business_id",
-                "as": "business_info"
-            }
-        },
-        {"$unwind": "$business_info"},
-        {"$unwind": "$business_info.categories"},
+    stages, category_field, _ = business_category_stages(denormalized)
+    pipeline = stages + [
         {
             "$group": {
-                "_id": "$business_info.categories",
+                "_id": category_field,
                 "total_compliments": {"$sum": "$compliment_count"},
                 "tip_count": {"$sum": 1},
                 "business_count": {"$addToSet": "$business_id"}
@@ -347,10 +387,11 @@ def find_top_business_categories_by_compliments():
     client.close()
 
 
-def find_businesses_with_tip_compliment_percentages():
+def find_businesses_with_tip_compliment_percentages(from_rollups=False):
+    """from_rollups: read the business_tip_stats rollup of mongo_rollups.py instead of regrouping every tip"""
     MONGODB_URI = "mongodb://localhost:27017/"
     DB_NAME = "yelp_db"
-    COLLECTION_NAME = "tip"
+    COLLECTION_NAME = "business_tip_stats" if from_rollups else "tip"
 
     client = pymongo.MongoClient(MONGODB_URI)
     db = client[DB_NAME]
@@ -359,8 +400,10 @@ def find_businesses_with_tip_compliment_percentages():
 
     start_time = time.time()
 
-    pipeline = [
-        {
+    if from_rollups:
+        group = {"$addFields": {"avg_compliments": {"$divide": ["$total_compliments", "$total_tips"]}}}
+    else:
+        group = {
             "$group": {
                 "_id": "$business_id",
                 "total_tips": {"$sum": 1},
@@ -376,7 +419,9 @@ def find_businesses_with_tip_compliment_percentages():
                 },
                 "avg_compliments": {"$avg": "$compliment_count"}
             }
-        },
+        }
+    pipeline = [
+        group,
         {
             "$match": {
                 "total_tips": {"$gte": 50}
@@ -433,7 +478,7 @@ def find_businesses_with_tip_compliment_percentages():
     client.close()
 
 
-def find_top_businesses_in_each_category():
+def find_top_businesses_in_each_category(denormalized=False):
     MONGODB_URI = "mongodb://localhost:27017/"
     DB_NAME = "yelp_db"
     COLLECTION_NAME = "tip"
@@ -444,23 +489,14 @@ def find_top_businesses_in_each_category():
 
     start_time = time.time()
 
-    pipeline = [
-        {
-            "$lookup": {
-                "from": "business",
-                "localField": "business_id",
-                "foreignField": "business_id",
-                "as": "business_info"
-            }
-        },
-        {"$unwind": "$business_info"},
-        {"$unwind": "$business_info.categories"},
+    stages, category_field, name_field = business_category_stages(denormalized)
+    pipeline = stages + [
         {
             "$group": {
                 "_id": {
-                    "category": "$business_info.categories",
+                    "category": category_field,
                     "business_id": "$business_id",
-                    "business_name": "$business_info.name"
+                    "business_name": name_field
                 },
                 "total_compliments": {"$sum": "$compliment_count"},
                 "tip_count": {"$sum": 1}
@@ -504,10 +540,11 @@ def find_top_businesses_in_each_category():
     client.close()
 
 
-def rank_categories_by_compliments():
+def rank_categories_by_compliments(denormalized=False, from_rollups=False):
+    """from_rollups: read the category_tip_stats rollup of mongo_rollups.py instead of regrouping every tip"""
     MONGODB_URI = "mongodb://localhost:27017/"
     DB_NAME = "yelp_db"
-    COLLECTION_NAME = "tip"
+    COLLECTION_NAME = "category_tip_stats" if from_rollups else "tip"
 
     client = pymongo.MongoClient(MONGODB_URI)
     db = client[DB_NAME]
@@ -515,26 +552,31 @@ def rank_categories_by_compliments():
 
     start_time = time.time()
 
-    pipeline = [
-        {
-            "$lookup": {
-                "from": "business",
-                "localField": "business_id",
-                "foreignField": "business_id",
-                "as": "business_info"
+    if from_rollups:
+        stages = [
+            {
+                "$project": {
+                    "total_compliments": 1,
+                    "tip_count": 1,
+                    "business_count": "$business_ids",
+                    "avg_compliments_per_tip": {"$divide": ["$total_compliments", "$tip_count"]}
+                }
             }
-        },
-        {"$unwind": "$business_info"},
-        {"$unwind": "$business_info.categories"},
-        {
-            "$group": {
-                "_id": "$business_info.categories",
-                "total_compliments": {"$sum": "$compliment_count"},
-                "tip_count": {"$sum": 1},
-                "business_count": {"$addToSet": "$business_id"},
-                "avg_compliments_per_tip": {"$avg": "$compliment_count"}
+        ]
+    else:
+        stages, category_field, _ = business_category_stages(denormalized)
+        stages += [
+            {
+                "$group": {
+                    "_id": category_field,
+                    "total_compliments": {"$sum": "$compliment_count"},
+                    "tip_count": {"$sum": 1},
+                    "business_count": {"$addToSet": "$business_id"},
+                    "avg_compliments_per_tip": {"$avg": "$compliment_count"}
+                }
             }
-        },
+        ]
+    pipeline = stages + [
         {"$sort": {"total_compliments": -1}}
     ]
 
@@ -637,23 +679,32 @@ def find_user_tips_per_year_with_elite_status():
     client.close()
 
 
-def find_friends_of_friends():
-    MONGODB_URI = "mongodb://localhost:27017/"
-    DB_NAME = "yelp_db"
-    COLLECTION_NAME = "user"
-
-    client = pymongo.MongoClient(MONGODB_URI)
-    db = client[DB_NAME]
-    user_collection = db[COLLECTION_NAME]
-
-    start_time = time.time()
-
-    pipeline = [
-        {
-            "$match": {
-                "user_id": {"$regex": "^A"}
-            }
-        },
+def friends_of_friends_stages(edges):
+    """The collection to aggregate and the stages grouping every user with its direct_friends and
+    potential_fof. edges: the users were loaded with MongoDBLoader.load_users_with_edges, so the
+    second hop walks the friendship collection on its (user_id, friend_id) index instead of the
+    users' friends arrays."""
+    if edges:
+        return "friendship", [
+            {
+                "$lookup": {
+                    "from": "friendship",
+                    "localField": "friend_id",
+                    "foreignField": "user_id",
+                    "pipeline": [{"$project": {"_id": 0, "friend_id": 1}}],
+                    "as": "second_hop"
+                }
+            },
+            {"$unwind": "$second_hop"},
+            {
+                "$group": {
+                    "_id": "$user_id",
+                    "direct_friends": {"$addToSet": "$friend_id"},
+                    "potential_fof": {"$addToSet": "$second_hop.friend_id"}
+                }
+            },
+        ]
+    return "user", [
         {
             "$lookup": {
                 "from": "user",
@@ -679,10 +730,32 @@ def find_friends_of_friends():
                 "potential_fof": {"$addToSet": "$friends_of_friends.user_id"}
             }
         },
+    ]
+
+
+def find_friends_of_friends(edges=False):
+    """edges: query the friendship collection of MongoDBLoader.load_users_with_edges"""
+    MONGODB_URI = "mongodb://localhost:27017/"
+    DB_NAME = "yelp_db"
+    COLLECTION_NAME, stages = friends_of_friends_stages(edges)
+
+    client = pymongo.MongoClient(MONGODB_URI)
+    db = client[DB_NAME]
+    collection = db[COLLECTION_NAME]
+
+    start_time = time.time()
+
+    pipeline = [
+        {
+            "$match": {
+                "user_id": {"$regex": "^A"}
+            }
+        },
+        *stages,
         {"$sort": {"_id": 1}}
     ]
 
-    results = user_collection.aggregate(pipeline)
+    results = collection.aggregate(pipeline)
 
     processed_results = []
     for result in results:
@@ -700,7 +773,7 @@ def find_friends_of_friends():
     end_time = time.time()
     query_time = end_time - start_time
 
-    print(f"Friends of Friends Analysis for Users Starting with 'A':")
+    print("Friends of Friends Analysis for Users Starting with 'A'" + (" (friendship edges):" if edges else ":"))
     print("-" * 80)
 
     for result in processed_results:
@@ -717,16 +790,22 @@ def find_friends_of_friends():
 
 
 if __name__ == '__main__':
+    INDEXED = None  # True/False: run the queries with/without the indexes of mongodb_bulkload.INDEXES
+    FRIENDSHIP_EDGES = False  # the users were loaded with MongoDBLoader.load_users_with_edges
+    DENORMALIZED_TIPS = False  # the tips were loaded with MongoDBLoader.load_tips_denormalized
+    FROM_ROLLUPS = False  # read the tip statistics from the rollups refreshed by mongo_rollups.py
+    if INDEXED is not None:
+        set_indexes(INDEXED)
     find_top_rated_restaurant_in_nashville()
     calculate_average_stars_per_city()
     find_user_reviews("___6aix-XvFcQz3GauAPpw")
-    calculate_users_review_count()
+    calculate_users_review_count(FROM_ROLLUPS)
     find_business_pairs_tipped_by_same_people()
-    find_top_users_with_most_tips_and_compliments()
+    find_top_users_with_most_tips_and_compliments(FROM_ROLLUPS)
 
-    find_top_business_categories_by_compliments()
-    find_businesses_with_tip_compliment_percentages()
-    find_top_businesses_in_each_category()
-    rank_categories_by_compliments()
+    find_top_business_categories_by_compliments(DENORMALIZED_TIPS)
+    find_businesses_with_tip_compliment_percentages(FROM_ROLLUPS)
+    find_top_businesses_in_each_category(DENORMALIZED_TIPS)
+    rank_categories_by_compliments(DENORMALIZED_TIPS, FROM_ROLLUPS)
     find_user_tips_per_year_with_elite_status()
-    find_friends_of_friends()
+    find_friends_of_friends(FRIENDSHIP_EDGES)
@@ -0,0 +1,177 @@
+import logging
+import time
+from typing import Dict, Any, List, Optional
+
+import pymongo
+
+from mongo_query import business_category_stages
+from mongodb_bulkload import LOADS_COLLECTION
+
+# Rollup collections of tip statistics, kept current by refresh():
+#   group    the $group stage computing the statistics of a batch of tips
+#   combine  how a field of an existing rollup document and of the new batch are merged
+#   join     the rollup groups by the categories of the tip's business (needs the $lookup or denormalized tips)
+ROLLUPS = {
+    'user_tip_stats': {
+        'group': {
+            "$group": {
+                "_id": "$user_id",
+                "tip_count": {"$sum": 1},
+                "total_compliments": {"$sum": "$compliment_count"},
+                "latest_tip": {"$max": "$date"}
+            }
+        },
+        'combine': {'tip_count': 'sum', 'total_compliments': 'sum', 'latest_tip': 'max'},
+    },
+    'business_tip_stats': {
+        'group': {
+            "$group": {
+                "_id": "$business_id",
+                "total_tips": {"$sum": 1},
+                "high_compliments": {"$sum": {"$cond": [{"$gt": ["$compliment_count", 10]}, 1, 0]}},
+                "low_compliments": {"$sum": {"$cond": [{"$lte": ["$compliment_count", 10]}, 1, 0]}},
+                "total_compliments": {"$sum": "$compliment_count"}
+            }
+        },
+        'combine': {'total_tips': 'sum', 'high_compliments': 'sum', 'low_compliments': 'sum',
+                    'total_compliments': 'sum'},
+    },
+    'category_tip_stats': {
+        'join': True,
+        'group': {
+            "$group": {
+                "_id": "$category",
+                "total_compliments": {"$sum": "$compliment_count"},
+                "tip_count": {"$sum": 1},
+                "business_ids": {"$addToSet": "$business_id"}
+            }
+        },
+        'combine': {'total_compliments': 'sum', 'tip_count': 'sum', 'business_ids': 'union'},
+    },
+}
+
+COMBINE = {
+    'sum': '$add',
+    'max': '$max',
+    'min': '$min',
+    'union': '$setUnion',
+}
+
+STATE_COLLECTION = 'rollup_state'
+
+
+class MongoRollups:
+    """Materialized rollups of the tip collection, refreshed incrementally with $merge.
+
+    Each rollup remembers the MongoDBLoader loads (LOADS_COLLECTION) whose tips it has folded in.
+    A refresh aggregates only the tips of the loads completed since, matched on their load_id, and
+    merges their statistics into the existing rollup documents, so its cost grows with the new tips
+    and reading a rollup costs O(groups). A refresh is refused while a load of the tips is running,
+    including a resumable load that was interrupted and not yet resumed; abandon_loads() marks loads
+    that will never finish (e.g. of a killed loader) failed. Tips of failed loads and tips inserted
+    without a load_id (loaded without MongoDBLoader(track_loads=True)) are never folded in; updated
+    or deleted tips need rebuild().
+    """
+
+    def __init__(self, db_uri: str, db_name: str, tip_collection: str = 'tip'):
+        self.client = pymongo.MongoClient(db_uri)
+        self.db = self.client[db_name]
+        self.tips = self.db[tip_collection]
+        self.logger = logging.getLogger(__name__)
+
+    def close(self):
+        self.client.close()
+
+    def abandon_loads(self, load_ids: Optional[List[str]] = None) -> List[str]:
+        """Mark running tip loads failed (default: all of them), so that refresh() can run again.
+        Their tips stay in the collection but are never folded into the rollups."""
+        query: Dict[str, Any] = {'collection': self.tips.name, 'status': 'running'}
+        if load_ids is not None:
+            query['_id'] = {'$in': load_ids}
+        abandoned = [load['_id'] for load in self.db[LOADS_COLLECTION].find(query)]
+        if abandoned:
+            self.db[LOADS_COLLECTION].update_many({'_id': {'$in': abandoned}},
+                                                  {'$set': {'status': 'failed', 'finished_at': time.time()}})
+            self.logger.info(f"Marked {len(abandoned)} load(s) of {self.tips.name} failed: {', '.join(abandoned)}")
+        return abandoned
+
+    def merge_stage(self, name: str) -> Dict[str, Any]:
+        combine = ROLLUPS[name]['combine']
+        return {
+            "$merge": {
+                "into": name,
+                "on": "_id",
+                "whenMatched": [{"$set": {field: {COMBINE[operation]: [f"${field}", f"$$new.{field}"]}
+                                          for field, operation in combine.items()}}],
+                "whenNotMatched": "insert"
+            }
+        }
+
+    def refresh(self, name: str, denormalized: bool = False) -> Dict[str, Any]:
+        """Fold the tips inserted since the last refresh into one rollup.
+
+        denormalized: the tips carry their business categories (MongoDBLoader.load_tips_denormalized).
+        """
+        start_time = time.time()
+        spec = ROLLUPS[name]
+        loads = self.db[LOADS_COLLECTION]
+        running = [load['_id'] for load in loads.find({'collection': self.tips.name, 'status': 'running'})]
+        if running:
+            self.logger.warning(f"{name}: Not refreshed, {len(running)} load(s) of {self.tips.name} still running " +
+                                f"or interrupted: {', '.join(running)}")
+            return {'rollup': name, 'refreshed': False, 'running_loads': running,
+                    'total_time': time.time() - start_time}
+
+        state = self.db[STATE_COLLECTION].find_one({'_id': name}) or {}
+        folded = set(state.get('loads', []))
+        new_loads = [load['_id'] for load in loads.find({'collection': self.tips.name, 'status': 'complete'})
+                     if load['_id'] not in folded]
+        if not new_loads:
+            return {'rollup': name, 'refreshed': False, 'total_time': time.time() - start_time}
+
+        self.tips.create_index('load_id')  # no-op once it exists
+        pipeline: List[Dict[str, Any]] = [{"$match": {"load_id": {"$in": new_loads}}}]
+        if spec.get('join'):
+            stages, category_field, _ = business_category_stages(denormalized)
+            pipeline += stages + [{"$addFields": {"category": category_field}}]
+        pipeline += [spec['group'], self.merge_stage(name)]
+        self.tips.aggregate(pipeline)
+
+        self.db[STATE_COLLECTION].update_one({'_id': name},
+                                             {'$addToSet': {'loads': {'$each': new_loads}},
+                                              '$set': {'refreshed_at': time.time()}}, upsert=True)
+        final_time = time.time() - start_time
+        self.logger.info(f"{name}: Folded in {len(new_loads)} load(s) in {final_time:.2f} seconds")
+        return {'rollup': name, 'refreshed': True, 'loads': new_loads, 'total_time': final_time}
+
+    def refresh_all(self, names: Optional[List[str]] = None, denormalized: bool = False) -> List[Dict[str, Any]]:
+        return [self.refresh(name, denormalized) for name in names or ROLLUPS]
+
+    def rebuild(self, name: str, denormalized: bool = False) -> Dict[str, Any]:
+        """Drop a rollup and its folded loads and compute it again from the tips of every completed load"""
+        self.db[name].drop()
+        self.db[STATE_COLLECTION].delete_one({'_id': name})
+        return self.refresh(name, denormalized)
+
+
+def main():
+    MONGODB_URI = "mongodb://localhost:27017/"
+    DB_NAME = "yelp_db"
+    DENORMALIZED_TIPS = False
+    ABANDON_RUNNING_LOADS = False  # mark tip loads that will never finish (killed loaders) failed first
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    rollups = MongoRollups(MONGODB_URI, DB_NAME)
+    if ABANDON_RUNNING_LOADS:
+        rollups.abandon_loads()
+    for result in rollups.refresh_all(denormalized=DENORMALIZED_TIPS):
+        if result.get('running_loads'):
+            status = "skipped, tip loads still running (set ABANDON_RUNNING_LOADS if they were killed)"
+        else:
+            status = "refreshed" if result['refreshed'] else "already current"
+        print(f"{result['rollup']}: {status} in {result['total_time']:.2f} seconds")
+    rollups.close()
+
+
+if __name__ == "__main__":
+    main()
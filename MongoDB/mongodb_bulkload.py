@@ -1,17 +1,124 @@
 import json
 import logging
+import os
+import random
+import sys
 import time
-from typing import Dict, Any
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Dict, Any, List, Optional
 
 import pymongo
-from pymongo import InsertOne
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'Dataset'))
+from jsonUtils import decode_json_line
+from batchTuner import BatchSizeTuner, FRIEND_SEPARATOR_BYTES
+from datasetUtils import split_file_ranges
+from loadCheckpoint import LoadCheckpoint, iter_lines
+
+# With MongoDBLoader(track_loads=True), loads of these collections are registered in LOADS_COLLECTION
+# and stamp every document with their load_id. MongoRollups folds tips in by completed load: their _ids
+# are generated on the client (per process, per client clock, or from the first run of a resumed load),
+# so the largest _id is no high-water mark.
+TRACKED_COLLECTIONS = ['tip']
+LOADS_COLLECTION = 'loads'
+
+# BSON size of a {_id, user_id, friend_id} edge document beyond its two ids: document length and
+# terminator (5), the ObjectId _id element (17), and the type, name, length and terminator bytes of
+# the user_id (14) and friend_id (16) string elements
+EDGE_DOCUMENT_OVERHEAD = 52
+
+# Indexes built by build_indexes once the bulk insert is done, for the lookups and filters of mongo_query.py
+INDEXES = {
+    'business': [
+        [('business_id', pymongo.ASCENDING)],  # $lookup from tip
+        [('city', pymongo.ASCENDING), ('stars', pymongo.DESCENDING), ('review_count', pymongo.DESCENDING)],
+        [('categories', pymongo.ASCENDING)],  # multikey
+    ],
+    'tip': [
+        [('business_id', pymongo.ASCENDING)],
+        [('user_id', pymongo.ASCENDING)],
+    ],
+    'user': [
+        [('user_id', pymongo.ASCENDING)],  # $lookup from tip and the friends-of-friends self-lookups
+    ],
+    'friendship': [
+        [('user_id', pymongo.ASCENDING), ('friend_id', pymongo.ASCENDING)],  # edges of load_users_with_edges
+    ],
+}
+
+
+def index_name(keys) -> str:
+    """The name MongoDB gives an index on keys by default"""
+    return '_'.join(f"{field}_{direction}" for field, direction in keys)
+
+
+def resumable_object_id(load_time: int, salt: int, offset: int) -> ObjectId:
+    """_id of the line ending at byte offset in a resumable load, the same on every retry of the load.
+    A resumed load reuses the load_time of its first run, so its _ids may sort below documents inserted
+    in the meantime; MongoRollups therefore tracks loads by load_id rather than by _id."""
+    return ObjectId(load_time.to_bytes(4, 'big') + salt.to_bytes(3, 'big') + offset.to_bytes(5, 'big'))
+
+
+# Client of a load_json_parallel worker process; MongoClient must not be shared across fork
+_worker_client = None
+
+
+def _init_insert_worker(db_uri: str):
+    global _worker_client
+    _worker_client = pymongo.MongoClient(db_uri)
+
+
+def _insert_range(db_name: str, collection_name: str, file_path: str, start: int, end: int,
+                  batch_size: int, load_id: Optional[str] = None) -> Dict[str, Any]:
+    """Parse the lines in the byte range [start, end) and insert them with insert_many(ordered=False)"""
+    start_time = time.time()
+    collection = _worker_client[db_name][collection_name]
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        lines = file.read(end - start).decode('utf-8').splitlines()
+
+    doc_count = errors = 0
+    batch = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            document = decode_json_line(line)
+        except json.JSONDecodeError:
+            errors += 1
+            continue
+        if load_id:
+            document['load_id'] = load_id
+        batch.append(document)
+        if len(batch) >= batch_size:
+            collection.insert_many(batch, ordered=False)
+            doc_count += len(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+        doc_count += len(batch)
+    return {'pid': os.getpid(), 'documents': doc_count, 'errors': errors, 'time': time.time() - start_time}
 
 
 class MongoDBLoader:
-    def __init__(self, db_uri: str, db_name: str, batch_size: int = 1000):
+    def __init__(self, db_uri: str, db_name: str, batch_size: int = 1000,
+                 target_batch_seconds: Optional[float] = 0.5, track_loads: bool = False):
+        """batch_size: initial batch size, adapted toward target_batch_seconds per insert
+        (None keeps it fixed; see BatchSizeTuner)
+        track_loads: register the loads of TRACKED_COLLECTIONS and stamp their documents with a
+        load_id, which MongoRollups needs; off by default so the benchmarked documents are unchanged"""
+        self.db_uri = db_uri
+        self.db_name = db_name
         self.client = pymongo.MongoClient(db_uri)
         self.db = self.client[db_name]
         self.batch_size = batch_size
+        self.target_batch_seconds = target_batch_seconds
+        self.track_loads = track_loads
         self.setup_logging()
 
     def setup_logging(self):
@@ -25,51 +132,497 @@ class MongoDBLoader:
         )
         self.logger = logging.getLogger(__name__)
 
-    def load_json_in_batches(self, file_path: str, collection_name: str) -> Dict[str, Any]:
+    def batch_tuner(self, name: str, initial: Optional[int] = None) -> BatchSizeTuner:
+        return BatchSizeTuner(name, initial or self.batch_size, self.target_batch_seconds, logger=self.logger)
+
+    def start_load(self, collection_name: str, file_path: str) -> Optional[str]:
+        """Register a load of a TRACKED_COLLECTIONS collection as running and return its load_id"""
+        if not self.track_loads or collection_name not in TRACKED_COLLECTIONS:
+            return None
+        load_id = str(ObjectId())
+        self.db[LOADS_COLLECTION].insert_one({'_id': load_id, 'collection': collection_name, 'source': file_path,
+                                              'status': 'running', 'started_at': time.time()})
+        return load_id
+
+    def finish_load(self, load_id: Optional[str], status: str = 'complete'):
+        """Mark a load complete, or failed (its documents are then never folded into the rollups)"""
+        if load_id:
+            self.db[LOADS_COLLECTION].update_one({'_id': load_id},
+                                                 {'$set': {'status': status, 'finished_at': time.time()}})
+
+    def load_json_in_batches(self, file_path: str, collection_name: str,
+                             checkpoint_path: Optional[str] = None) -> Dict[str, Any]:
+        """checkpoint_path: make the load resumable, see load_json_resumable"""
+        if checkpoint_path:
+            return self.load_json_resumable(file_path, collection_name, checkpoint_path)
         start_time = time.time()
         collection = self.db[collection_name]
+        tuner = self.batch_tuner(collection_name)
+        load_id = self.start_load(collection_name, file_path)
         doc_count = 0
 
+        def write(batch, batch_bytes):
+            batch_start = time.perf_counter()
+            collection.bulk_write(batch, ordered=False)
+            tuner.record(len(batch), batch_bytes, time.perf_counter() - batch_start)
+
         try:
             batch = []
+            batch_bytes = 0
             with open(file_path, 'r') as file:
                 for line in file:
                     try:
-                        document = json.loads(line.strip())
+                        document = decode_json_line(line.strip())
+                        if load_id:
+                            document['load_id'] = load_id
                         batch.append(InsertOne(document))
+                        batch_bytes += len(line)
                         doc_count += 1
 
-                        if len(batch) >= self.batch_size:
-                            collection.bulk_write(batch, ordered=False)
-                            current_time = time.time() - start_time
+                        if tuner.full(len(batch), batch_bytes):
+                            write(batch, batch_bytes)
                             batch = []
+                            batch_bytes = 0
 
                     except json.JSONDecodeError as e:
                         self.logger.error(f"Error decoding JSON: {e}")
                         continue
                 if batch:
-                    collection.bulk_write(batch, ordered=False)
+                    write(batch, batch_bytes)
                     final_time = time.time() - start_time
                     self.logger.info(
                         f"{collection_name}: Completed {doc_count:,} documents in {final_time:.2f} seconds " +
                         f"({doc_count / final_time:.2f} documents/second)")
 
-        except Exception as e:
-            self.logger.error(f"Error during file processing: {e}")
+        except BaseException as e:  # also Ctrl-C, which would otherwise leave the load running
+            self.logger.error(f"Error during file processing: {e!r}")
+            self.finish_load(load_id, 'failed')
+            raise
+        self.finish_load(load_id)
+
+        return {
+            'collection': collection_name,
+            'total_documents': doc_count,
+            'total_time': time.time() - start_time,
+            'batch_sizes': {collection_name: tuner.summary()}
+        }
+
+    def load_json_resumable(self, file_path: str, collection_name: str, checkpoint_path: str) -> Dict[str, Any]:
+        """Insert a JSONL file in batches, saving a checkpoint (byte offset and batch number) after each
+        committed batch. Rerunning with the same checkpoint_path continues after the last saved batch.
+
+        Every document gets an _id derived from its position in the file, so the documents of a batch
+        that was written but not checkpointed before a crash are rejected as duplicates on the retry
+        instead of being inserted twice. The load_id of a tracked collection is kept in the checkpoint,
+        so the load stays running (and MongoRollups.refresh refuses to run) until a rerun completes it.
+        """
+        start_time = time.time()
+        collection = self.db[collection_name]
+        checkpoint = LoadCheckpoint(checkpoint_path, file_path)
+        if checkpoint.stale and checkpoint.stale.get('load_id'):
+            # The source changed since the interrupted run, which will therefore never be resumed
+            self.finish_load(checkpoint.stale['load_id'], 'failed')
+        if checkpoint.complete:
+            self.logger.info(f"{collection_name}: {file_path} was already loaded (checkpoint {checkpoint_path})")
+            return {'collection': collection_name, 'total_documents': 0, 'total_time': time.time() - start_time,
+                    'already_loaded': True}
+        if checkpoint.resumed:
+            self.logger.info(f"{collection_name}: Resuming after batch {checkpoint.batch:,} " +
+                             f"at byte {checkpoint.offset:,}")
+        else:
+            checkpoint.save(load_time=int(time.time()), salt=random.getrandbits(24),
+                            load_id=self.start_load(collection_name, file_path))
+        load_time, salt = checkpoint.state['load_time'], checkpoint.state['salt']
+        load_id = checkpoint.state.get('load_id')
+        tuner = self.batch_tuner(collection_name, checkpoint.state.get('batch_size'))
+
+        def insert(batch, batch_bytes):
+            batch_start = time.perf_counter()
+            try:
+                collection.insert_many(batch, ordered=False)
+            except BulkWriteError as e:
+                if any(error['code'] != 11000 for error in e.details['writeErrors']):
+                    raise
+                self.logger.info(f"{collection_name}: Skipped {len(e.details['writeErrors']):,} documents " +
+                                 "inserted before the restart")
+            tuner.record(len(batch), batch_bytes, time.perf_counter() - batch_start)
+
+        doc_count = 0
+        batch_number = checkpoint.batch
+        batch = []
+        start = checkpoint.offset
+        for offset, line in iter_lines(file_path, start):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                document = decode_json_line(line)
+            except json.JSONDecodeError as e:
+                self.logger.error(f"Error decoding JSON: {e}")
+                continue
+            document.setdefault('_id', resumable_object_id(load_time, salt, offset))
+            if load_id:
+                document['load_id'] = load_id
+            batch.append(document)
+            if tuner.full(len(batch), offset - start):
+                insert(batch, offset - start)
+                doc_count += len(batch)
+                batch_number += 1
+                checkpoint.save(offset, batch_number, batch_size=tuner.size)
+                batch = []
+                start = offset
+        if batch:
+            insert(batch, os.path.getsize(file_path) - start)
+            doc_count += len(batch)
+            batch_number += 1
+        checkpoint.save(offset=os.path.getsize(file_path), batch=batch_number)
+        self.finish_load(load_id)
+        checkpoint.finish()
+
+        final_time = time.time() - start_time
+        self.logger.info(
+            f"{collection_name}: Completed {doc_count:,} documents in {final_time:.2f} seconds " +
+            f"({doc_count / final_time:.2f} documents/second, {batch_number:,} batches in total)")
+        return {
+            'collection': collection_name,
+            'total_documents': doc_count,
+            'total_time': final_time,
+            'batch_sizes': {collection_name: tuner.summary()}
+        }
+
+    def load_json_parallel(self, file_path: str, collection_name: str, workers: Optional[int] = None,
+                           max_in_flight: Optional[int] = None,
+                           chunk_bytes: int = 16 * 1024 * 1024) -> Dict[str, Any]:
+        """Insert a JSONL file with a pool of worker processes, so parsing and server time overlap.
+
+        The file is cut into newline-aligned chunks of about chunk_bytes; each worker parses a chunk
+        and inserts it in batches of self.batch_size. At most max_in_flight chunks (default: twice
+        the workers) are submitted at a time. Returns the totals plus per-worker throughput.
+        """
+        start_time = time.time()
+        workers = workers or os.cpu_count() or 1
+        max_in_flight = max_in_flight or 2 * workers
+        ranges = split_file_ranges(file_path, max(workers, -(-os.path.getsize(file_path) // chunk_bytes)))
+
+        results: List[Dict[str, Any]] = []
+        load_id = self.start_load(collection_name, file_path)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_insert_worker,
+                                     initargs=(self.db_uri,)) as executor:
+                pending = set()
+                for start, end in ranges:
+                    if len(pending) >= max_in_flight:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        results += [future.result() for future in done]
+                    pending.add(executor.submit(_insert_range, self.db_name, collection_name, file_path, start, end,
+                                                self.batch_size, load_id))
+                results += [future.result() for future in pending]
+        except BaseException:
+            self.finish_load(load_id, 'failed')
             raise
+        self.finish_load(load_id)
+
+        per_worker: Dict[int, Dict[str, Any]] = {}
+        for result in results:
+            worker = per_worker.setdefault(result['pid'], {'documents': 0, 'chunks': 0, 'time': 0.0})
+            worker['documents'] += result['documents']
+            worker['chunks'] += 1
+            worker['time'] += result['time']
+        for worker in per_worker.values():
+            worker['documents_per_second'] = worker['documents'] / worker['time'] if worker['time'] else 0.0
+
+        doc_count = sum(result['documents'] for result in results)
+        errors = sum(result['errors'] for result in results)
+        if errors:
+            self.logger.error(f"{collection_name}: {errors:,} lines could not be decoded")
+        final_time = time.time() - start_time
+        self.logger.info(
+            f"{collection_name}: Completed {doc_count:,} documents in {final_time:.2f} seconds " +
+            f"({doc_count / final_time:.2f} documents/second, {len(per_worker)} workers)")
+        for pid, worker in per_worker.items():
+            self.logger.info(f"  worker {pid}: {worker['documents']:,} documents in {worker['chunks']} chunks, " +
+                             f"{worker['documents_per_second']:.2f} documents/second")
 
         return {
             'collection': collection_name,
             'total_documents': doc_count,
+            'total_time': final_time,
+            'workers': list(per_worker.values())
+        }
+
+    def build_indexes(self, collections: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Build the INDEXES of the given collections (default: all), timing each build on its own."""
+        start_time = time.time()
+        builds = []
+        for collection_name, indexes in INDEXES.items():
+            if collections and collection_name not in collections:
+                continue
+            for keys in indexes:
+                build_start = time.time()
+                name = self.db[collection_name].create_index(keys)
+                build_time = time.time() - build_start
+                builds.append({'collection': collection_name, 'index': name, 'time': build_time})
+                self.logger.info(f"{collection_name}: Built index {name} in {build_time:.2f} seconds")
+
+        return {
+            'indexes': builds,
             'total_time': time.time() - start_time
         }
 
+    def drop_indexes(self, collections: Optional[List[str]] = None):
+        """Drop the INDEXES of the given collections (default: all), e.g. to time queries without them."""
+        for collection_name, indexes in INDEXES.items():
+            if collections and collection_name not in collections:
+                continue
+            existing = self.db[collection_name].index_information()
+            for keys in indexes:
+                if index_name(keys) in existing:
+                    self.db[collection_name].drop_index(index_name(keys))
+                    self.logger.info(f"{collection_name}: Dropped index {index_name(keys)}")
+
+    def append_friend_edges(self, file_path: str, collection_name: str = 'user') -> Dict[str, Any]:
+        """Append the friend edges of a delta batch (<preset>_delta<k>_friends.json) to the users' friends arrays."""
+        start_time = time.time()
+        collection = self.db[collection_name]
+        # Every edge updates one user document by user_id, so the lookup must not be a collection scan
+        collection.create_index('user_id')
+        tuner = self.batch_tuner(f"{collection_name}.friends")
+        edge_count = batch_edges = batch_bytes = 0
+
+        def flush(friends_by_user):
+            batch_start = time.perf_counter()
+            collection.bulk_write([UpdateOne({'user_id': user_id}, {'$addToSet': {'friends': {'$each': friends}}})
+                                   for user_id, friends in friends_by_user.items()], ordered=False)
+            tuner.record(batch_edges, batch_bytes, time.perf_counter() - batch_start)
+
+        friends_by_user = {}
+        with open(file_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    edge = decode_json_line(line.strip())
+                except json.JSONDecodeError as e:
+                    self.logger.error(f"Error decoding JSON: {e}")
+                    continue
+                friends_by_user.setdefault(edge['user_id'], []).append(edge['friend_id'])
+                edge_count += 1
+                batch_edges += 1
+                batch_bytes += len(line)
+                if tuner.full(batch_edges, batch_bytes):
+                    flush(friends_by_user)
+                    friends_by_user = {}
+                    batch_edges = batch_bytes = 0
+            if friends_by_user:
+                flush(friends_by_user)
+
+        final_time = time.time() - start_time
+        self.logger.info(f"{collection_name}: Appended {edge_count:,} friend edges in {final_time:.2f} seconds")
+        return {
+            'collection': collection_name,
+            'total_documents': edge_count,
+            'total_time': final_time,
+            'batch_sizes': {f"{collection_name}.friends": tuner.summary()}
+        }
+
+    def load_tips_denormalized(self, file_path: str, business_file_path: str,
+                               collection_name: str = 'tip') -> Dict[str, Any]:
+        """Load tips with the name and categories of their business embedded (business_name, categories),
+        so the category queries of mongo_query.py need no $lookup into business."""
+        start_time = time.time()
+        businesses = {}
+        with open(business_file_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    business = decode_json_line(line.strip())
+                except json.JSONDecodeError:
+                    continue
+                # categories are kept as stored in business, so $unwind sees the same values as after a $lookup
+                businesses[business['business_id']] = (business.get('name'), business.get('categories'))
+
+        collection = self.db[collection_name]
+        tuner = self.batch_tuner(collection_name)
+
+        def insert(batch, batch_bytes):
+            batch_start = time.perf_counter()
+            collection.insert_many(batch, ordered=False)
+            tuner.record(len(batch), batch_bytes, time.perf_counter() - batch_start)
+
+        load_id = self.start_load(collection_name, file_path)
+        doc_count = missing = batch_bytes = 0
+        batch = []
+        try:
+            with open(file_path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        document = decode_json_line(line.strip())
+                    except json.JSONDecodeError as e:
+                        self.logger.error(f"Error decoding JSON: {e}")
+                        continue
+                    if document['business_id'] in businesses:
+                        document['business_name'], document['categories'] = businesses[document['business_id']]
+                    else:
+                        missing += 1
+                    if load_id:
+                        document['load_id'] = load_id
+                    batch.append(document)
+                    batch_bytes += len(line)
+                    doc_count += 1
+                    if tuner.full(len(batch), batch_bytes):
+                        insert(batch, batch_bytes)
+                        batch = []
+                        batch_bytes = 0
+                if batch:
+                    insert(batch, batch_bytes)
+        except BaseException:
+            self.finish_load(load_id, 'failed')
+            raise
+        self.finish_load(load_id)
+
+        if missing:
+            self.logger.warning(f"{collection_name}: {missing:,} tips reference a business missing from "
+                                f"{business_file_path}")
+        final_time = time.time() - start_time
+        self.logger.info(
+            f"{collection_name}: Completed {doc_count:,} denormalized documents in {final_time:.2f} seconds " +
+            f"({doc_count / final_time:.2f} documents/second)")
+        return {
+            'collection': collection_name,
+            'total_documents': doc_count,
+            'total_time': final_time,
+            'batch_sizes': {collection_name: tuner.summary()}
+        }
+
+    def load_users_with_edges(self, file_path: str, collection_name: str = 'user',
+                              edge_collection: str = 'friendship') -> Dict[str, Any]:
+        """Load users without their friends arrays, writing one {user_id, friend_id} document per
+        friendship to edge_collection instead (indexed on (user_id, friend_id) by build_indexes)."""
+        start_time = time.time()
+        collection = self.db[collection_name]
+        edges = self.db[edge_collection]
+        # Users with thousands of friends and two-field edge documents need very different batch sizes
+        user_tuner, edge_tuner = self.batch_tuner(collection_name), self.batch_tuner(edge_collection)
+
+        def insert(target, tuner, batch, batch_bytes):
+            batch_start = time.perf_counter()
+            target.insert_many(batch, ordered=False)
+            tuner.record(len(batch), batch_bytes, time.perf_counter() - batch_start)
+
+        doc_count = edge_count = user_bytes = edge_bytes = 0
+        user_batch, edge_batch = [], []
+        with open(file_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    document = decode_json_line(line.strip())
+                except json.JSONDecodeError as e:
+                    self.logger.error(f"Error decoding JSON: {e}")
+                    continue
+                friends = document.pop('friends', None) or []
+                if isinstance(friends, str):  # the Yelp dataset stores them as one comma separated string
+                    friends = [] if friends == 'None' else [friend.strip() for friend in friends.split(',')]
+                user_batch.append(document)
+                edge_batch += [{'user_id': document['user_id'], 'friend_id': friend_id} for friend_id in friends]
+                doc_count += 1
+                edge_count += len(friends)
+                # The friend ids are most of the line, and every edge document repeats the user_id
+                friend_bytes = sum(len(friend) for friend in friends)
+                user_bytes += len(line) - friend_bytes - len(friends) * FRIEND_SEPARATOR_BYTES
+                edge_bytes += friend_bytes + len(friends) * (len(document['user_id']) + EDGE_DOCUMENT_OVERHEAD)
+
+                if user_tuner.full(len(user_batch), user_bytes):
+                    insert(collection, user_tuner, user_batch, user_bytes)
+                    user_batch, user_bytes = [], 0
+                if edge_tuner.full(len(edge_batch), edge_bytes):
+                    insert(edges, edge_tuner, edge_batch, edge_bytes)
+                    edge_batch, edge_bytes = [], 0
+            if user_batch:
+                insert(collection, user_tuner, user_batch, user_bytes)
+            if edge_batch:
+                insert(edges, edge_tuner, edge_batch, edge_bytes)
+
+        final_time = time.time() - start_time
+        self.logger.info(f"{collection_name}: Completed {doc_count:,} documents and {edge_count:,} {edge_collection} " +
+                         f"edges in {final_time:.2f} seconds ({doc_count / final_time:.2f} documents/second)")
+        return {
+            'collection': collection_name,
+            'total_documents': doc_count,
+            'total_edges': edge_count,
+            'total_time': final_time,
+            'batch_sizes': {collection_name: user_tuner.summary(), edge_collection: edge_tuner.summary()}
+        }
+
+    def load_delta(self, users_path: str, tips_path: str, friends_path: str,
+                   edge_collection: Optional[str] = None,
+                   business_path: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Append one delta batch from the dataset generator: new users, new tips and new friend edges.
+
+        edge_collection: set for databases loaded with load_users_with_edges; the friendships then go
+        to that collection instead of the users' friends arrays.
+        business_path: set for databases loaded with load_tips_denormalized; the business file the
+        new tips take their business name and categories from.
+        """
+        if business_path:
+            tips = self.load_tips_denormalized(tips_path, business_path, 'tip')
+        else:
+            tips = self.load_json_in_batches(tips_path, 'tip')
+        if edge_collection:
+            return {
+                'user': self.load_users_with_edges(users_path, 'user', edge_collection),
+                'tip': tips,
+                'friends': self.load_json_in_batches(friends_path, edge_collection),
+            }
+        return {
+            'user': self.load_json_in_batches(users_path, 'user'),
+            'tip': tips,
+            'friends': self.append_friend_edges(friends_path, 'user'),
+        }
+
+    def load_id_map(self, file_path: str, collection_name: str = 'id_map') -> Dict[str, Any]:
+        """Load the <preset>_id_map.tsv of an int_ids dataset so Yelp IDs can be translated to surrogate keys."""
+        start_time = time.time()
+        collection = self.db[collection_name]
+        tuner = self.batch_tuner(collection_name)
+        doc_count = batch_bytes = 0
+
+        def write(batch, batch_bytes):
+            batch_start = time.perf_counter()
+            collection.bulk_write(batch, ordered=False)
+            tuner.record(len(batch), batch_bytes, time.perf_counter() - batch_start)
+
+        batch = []
+        with open(file_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                kind, surrogate_id, yelp_id = line.rstrip('\n').split('\t')
+                batch.append(InsertOne({'kind': kind, 'id': int(surrogate_id), 'yelp_id': yelp_id}))
+                batch_bytes += len(line)
+                doc_count += 1
+                if tuner.full(len(batch), batch_bytes):
+                    write(batch, batch_bytes)
+                    batch = []
+                    batch_bytes = 0
+            if batch:
+                write(batch, batch_bytes)
+        collection.create_index([('kind', pymongo.ASCENDING), ('yelp_id', pymongo.ASCENDING)], unique=True)
+        self.logger.info(f"{collection_name}: Loaded {doc_count:,} ID mappings")
+
+        return {
+            'collection': collection_name,
+            'total_documents': doc_count,
+            'total_time': time.time() - start_time,
+            'batch_sizes': {collection_name: tuner.summary()}
+        }
+
 
 def main():
     MONGODB_URI = "mongodb://localhost:27017/"
     DB_NAME = "yelp_db"
-    BATCH_SIZE = 1000
-    loader = MongoDBLoader(MONGODB_URI, DB_NAME, BATCH_SIZE)
+    BATCH_SIZE = 1000  # initial batch size
+    TARGET_BATCH_SECONDS = 0.5  # batch sizes adapt toward this insert latency; None keeps BATCH_SIZE
+    WORKERS = 1  # > 1 inserts each file with load_json_parallel
+    BUILD_INDEXES = True  # build INDEXES after all files are inserted
+    FRIENDSHIP_EDGES = False  # store friendships in the friendship collection instead of user.friends
+    DENORMALIZED_TIPS = False  # embed business_name and categories in every tip
+    CHECKPOINT_DIR = None  # directory for <collection>.checkpoint files that make the loads resumable
+    TRACK_LOADS = False  # stamp the tips with their load_id, needed by mongo_rollups.py
+    loader = MongoDBLoader(MONGODB_URI, DB_NAME, BATCH_SIZE, TARGET_BATCH_SECONDS, TRACK_LOADS)
 
     files = {
         'business': '/Users/puxuanwang/Downloads/reduced_datasets/set3_businesses.json',
@@ -79,15 +632,39 @@ def main():
 
     for collection_name, file_path in files.items():
         try:
-            metrics = loader.load_json_in_batches(file_path, collection_name)
+            if collection_name == 'tip' and DENORMALIZED_TIPS:
+                metrics = loader.load_tips_denormalized(file_path, files['business'], collection_name)
+            elif collection_name == 'user' and FRIENDSHIP_EDGES:
+                metrics = loader.load_users_with_edges(file_path, collection_name)
+            elif WORKERS > 1:
+                metrics = loader.load_json_parallel(file_path, collection_name, workers=WORKERS)
+            else:
+                checkpoint_path = os.path.join(CHECKPOINT_DIR, f"{collection_name}.checkpoint") \
+                    if CHECKPOINT_DIR else None
+                metrics = loader.load_json_in_batches(file_path, collection_name, checkpoint_path)
             print(f"\nSummary for {collection_name}:")
+            if metrics.get('already_loaded'):
+                print(f"Already loaded (checkpoint in {CHECKPOINT_DIR})")
+                print("-" * 50)
+                continue
             print(f"Total documents: {metrics['total_documents']:,}")
             print(f"Total time: {metrics['total_time']:.2f} seconds")
-            print(f"Average speed: {metrics['total_documents'] / metrics['total_time']:.2f} documents/second")
+            if metrics['total_time'] > 0:
+                print(f"Average speed: {metrics['total_documents'] / metrics['total_time']:.2f} documents/second")
+            for name, sizes in metrics.get('batch_sizes', {}).items():
+                print(f"Batch size for {name}: {sizes['batch_size']:,} " +
+                      f"(range {sizes['min_batch_size']:,}-{sizes['max_batch_size']:,})")
             print("-" * 50)
         except Exception as e:
             print(f"Failed to process {file_path}: {e}")
 
+    if BUILD_INDEXES:
+        metrics = loader.build_indexes()
+        print("\nIndex builds:")
+        for build in metrics['indexes']:
+            print(f"{build['collection']}.{build['index']}: {build['time']:.2f} seconds")
+        print(f"Total index build time: {metrics['total_time']:.2f} seconds")
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,42 @@
+# Append one delta batch from the dataset generator (generate_datasets.py --deltas N) to an
+# already loaded database. Tables are not dropped or truncated, so run mysql_bulkload.sql first,
+# then this file once per delta with the paths below pointing at that delta's .dat files, made with
+#   python mysql_bulkload.py --users <preset>_delta1_users.json --tips <preset>_delta1_tips.json
+#                            --friend-edges <preset>_delta1_friends.json --prefix reduced_delta1
+USE world;
+
+LOAD DATA INFILE 'C:\\ProgramData\\MySQL\\MySQL Server 8.3\\Uploads\\reduced_delta1_users.dat'
+IGNORE
+INTO TABLE user
+FIELDS TERMINATED BY '|'
+LINES TERMINATED BY '\n'
+(user_id, name, review_count, yelping_since, useful, funny, cool, fans, average_stars,
+ compliment_hot, compliment_more, compliment_profile, compliment_cute,
+ compliment_list, compliment_note, compliment_plain, compliment_cool,
+ compliment_funny, compliment_writer, compliment_photos);
+
+LOAD DATA INFILE 'C:\\ProgramData\\MySQL\\MySQL Server 8.3\\Uploads\\reduced_delta1_tips.dat'
+IGNORE
+INTO TABLE Tip
+FIELDS TERMINATED BY '|'
+LINES TERMINATED BY '\n'
+(user_id, business_id, text, @date, compliment_count)
+SET date = STR_TO_DATE(@date, '%Y-%m-%d %H:%i:%s');
+
+LOAD DATA INFILE 'C:\\ProgramData\\MySQL\\MySQL Server 8.3\\Uploads\\reduced_delta1_friends.dat'
+IGNORE
+INTO TABLE Friends
+FIELDS TERMINATED BY '|'
+LINES TERMINATED BY '\n'
+(user_id, friend_id);
+
+LOAD DATA INFILE 'C:\\ProgramData\\MySQL\\MySQL Server 8.3\\Uploads\\reduced_delta1_friend_edges.dat'
+IGNORE
+INTO TABLE Friends
+FIELDS TERMINATED BY '|'
+LINES TERMINATED BY '\n'
+(user_id, friend_id);
+
+SELECT COUNT(*) FROM user;
+SELECT COUNT(*) FROM Tip;
+SELECT COUNT(*) FROM Friends;
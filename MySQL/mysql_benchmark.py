@@ -0,0 +1,364 @@
+import argparse
+import json
+import time
+from typing import Dict, List, Any, Optional
+
+import mysql.connector
+import numpy as np
+
+from mysql_loader import MySQLLoader, SCHEMA_PROFILES, add_connection_arguments, connection_config
+from mysql_scatter_gather import AGGREGATIONS, SPLIT_MODES, ScatterGatherExecutor
+
+# Queries #1-#12 of mysql_bulkload.sql, with the user IDs as parameters, and alternative formulations
+# of some of them (marked with the query they are a variant of). The int_keys variants run on the integer
+# key schema of mysql_bulkload_intkeys.sql (mysql_loader.py --int-keys) and translate the Yelp user IDs
+# through IdMap; string_keys queries only make sense on the Yelp IDs.
+# Table names follow the CREATE TABLE statements, since they are case sensitive on Linux.
+QUERIES = {
+    'q01_top_rated_in_city': {
+        'description': "Find top-rated (star) restaurant in Nashville",
+        'sql': """
+            SELECT name, stars
+            FROM business
+            WHERE city = %(city)s
+            ORDER BY stars DESC, review_count DESC
+            LIMIT 1""",
+    },
+    'q02_average_stars_per_city': {
+        'description': "Calculate the average star in every city",
+        'sql': """
+            SELECT city, AVG(stars) AS average_stars
+            FROM business
+            GROUP BY city""",
+    },
+    'q03_user_tips': {
+        'description': "Find a user's all review",
+        'sql': """
+            SELECT tip.*
+            FROM tip
+            WHERE user_id = %(user_id)s""",
+    },
+    'q04_tips_per_user': {
+        'description': "Calculate users' review by number",
+        'sql': """
+            SELECT user_id, COUNT(*) AS review_count
+            FROM tip
+            GROUP BY user_id
+            ORDER BY review_count DESC""",
+    },
+    'q05_business_pairs_same_user': {
+        'description': "Find businesses pairs that tipped by the same people",
+        'sql': """
+            SELECT t1.business_id AS business1, t2.business_id AS business2, t1.user_id
+            FROM tip t1
+            JOIN tip t2 ON t1.user_id = t2.user_id AND t1.business_id < t2.business_id
+            GROUP BY t1.business_id, t2.business_id, t1.user_id""",
+    },
+    'q06_top_complimented_users': {
+        'description': "Identify the top 10 users who have written the most tips with more than 100 compliments",
+        'sql': """
+            SELECT user_id, COUNT(*) AS tip_count, SUM(compliment_count) AS total_compliments
+            FROM tip
+            GROUP BY user_id
+            HAVING total_compliments > %(min_compliments)s
+            ORDER BY tip_count DESC
+            LIMIT 10""",
+    },
+    'q07_top_categories': {
+        'description': "Find the top 5 most popular business categories based on the sum of compliments",
+        'sql': """
+            SELECT c.category, SUM(t.compliment_count) AS total_compliments
+            FROM Category c
+            JOIN tip t ON c.business_id = t.business_id
+            GROUP BY c.category
+            ORDER BY total_compliments DESC
+            LIMIT 5""",
+    },
+    'q08_compliment_share_per_business': {
+        'description': "Find businesses with at least 5 tips and the share of tips above/below 10 compliments",
+        'sql': """
+            SELECT b.business_id, b.name,
+                   SUM(CASE WHEN t.compliment_count > 10 THEN 1 ELSE 0 END) * 100.0 / COUNT(*) AS percent_above_10,
+                   SUM(CASE WHEN t.compliment_count <= 10 THEN 1 ELSE 0 END) * 100.0 / COUNT(*)
+                       AS percent_below_or_equal_10
+            FROM business b
+            JOIN tip t ON b.business_id = t.business_id
+            GROUP BY b.business_id, b.name
+            HAVING COUNT(*) >= %(min_tips)s""",
+    },
+    'q09_top_businesses_per_category': {
+        'description': "Identify the top 5 businesses in each category ranked by the total count of compliments",
+        'sql': """
+            SELECT c.category, t.business_id, b.name, SUM(t.compliment_count) AS total_compliments
+            FROM Category c
+            JOIN tip t ON c.business_id = t.business_id
+            JOIN business b ON c.business_id = b.business_id
+            GROUP BY c.category, t.business_id
+            ORDER BY c.category, total_compliments DESC
+            LIMIT 5""",
+    },
+    'q10_rank_categories': {
+        'description': "Rank categories based on the number of compliments received in tips",
+        'sql': """
+            SELECT c.category, SUM(t.compliment_count) AS total_compliments
+            FROM Category c
+            JOIN tip t ON c.business_id = t.business_id
+            GROUP BY c.category
+            ORDER BY total_compliments DESC""",
+    },
+    'q11_tips_per_user_year': {
+        'description': "Number of tips the user writes in each year",
+        'sql': """
+            SELECT u.user_id, YEAR(t.date) AS year, COUNT(*) AS tip_count
+            FROM tip t
+            JOIN user u ON t.user_id = u.user_id
+            GROUP BY u.user_id, YEAR(t.date)""",
+    },
+    'q12_friends_of_friends': {
+        'description': "Find a person's friends' friends but not the person's friends",
+        'sql': """
+            SELECT DISTINCT f2.friend_id
+            FROM Friends f1
+            JOIN Friends f2 ON f1.friend_id = f2.user_id
+            WHERE f2.friend_id = %(friend_user_id)s
+               AND f2.friend_id NOT IN (SELECT friend_id FROM Friends WHERE user_id = %(friend_user_id)s)""",
+    },
+    'q07_top_categories_summary': {
+        'description': "Top 5 categories by compliments, read from CategorySummary",
+        'variant_of': 'q07_top_categories',
+        'sql': """
+            SELECT category, total_compliments
+            FROM CategorySummary
+            WHERE tip_count > 0
+            ORDER BY total_compliments DESC
+            LIMIT 5""",
+    },
+    'q09_top_businesses_per_category_summary': {
+        'description': "Query #9 read from CategoryBusinessSummary",
+        'variant_of': 'q09_top_businesses_per_category',
+        'sql': """
+            SELECT s.category, s.business_id, b.name, s.total_compliments
+            FROM CategoryBusinessSummary s
+            JOIN business b ON s.business_id = b.business_id
+            WHERE s.tip_count > 0
+            ORDER BY s.category, s.total_compliments DESC
+            LIMIT 5""",
+    },
+    'q10_rank_categories_summary': {
+        'description': "Rank categories by compliments, read from CategorySummary",
+        'variant_of': 'q10_rank_categories',
+        'sql': """
+            SELECT category, total_compliments
+            FROM CategorySummary
+            WHERE tip_count > 0
+            ORDER BY total_compliments DESC""",
+    },
+    'q12_friends_of_friends_set_based': {
+        'description': "Friends' friends of one user that are not already friends, as one anti-join",
+        'variant_of': 'q12_friends_of_friends',
+        'sql': """
+            SELECT DISTINCT f2.friend_id
+            FROM Friends f1
+            JOIN Friends f2 ON f2.user_id = f1.friend_id
+            LEFT JOIN Friends direct ON direct.user_id = f1.user_id AND direct.friend_id = f2.friend_id
+            WHERE f1.user_id = %(friend_user_id)s
+              AND f2.friend_id <> f1.user_id
+              AND direct.user_id IS NULL""",
+    },
+    'q12_friends_of_friends_all_users': {
+        'description': "Friends' friends that are not already friends for every user matching a prefix "
+                       "(the GetFriendsOfFriends() cursor procedure as one statement)",
+        'variant_of': 'q12_friends_of_friends',
+        'string_keys': True,
+        'sql': """
+            SELECT DISTINCT f1.user_id, f2.friend_id
+            FROM Friends f1
+            JOIN Friends f2 ON f2.user_id = f1.friend_id
+            LEFT JOIN Friends direct ON direct.user_id = f1.user_id AND direct.friend_id = f2.friend_id
+            WHERE f1.user_id LIKE %(user_prefix)s
+              AND f2.friend_id <> f1.user_id
+              AND direct.user_id IS NULL""",
+    },
+    'q03_user_tips_int_keys': {
+        'description': "Query #3 on the integer key schema",
+        'variant_of': 'q03_user_tips',
+        'int_keys': True,
+        'sql': """
+            SELECT tip.*
+            FROM tip
+            WHERE user_id = (SELECT id FROM IdMap WHERE kind = 'user' AND yelp_id = %(user_id)s)""",
+    },
+    'q12_friends_of_friends_int_keys': {
+        'description': "Query #12 on the integer key schema",
+        'variant_of': 'q12_friends_of_friends',
+        'int_keys': True,
+        'sql': """
+            SELECT DISTINCT f2.friend_id
+            FROM Friends f1
+            JOIN Friends f2 ON f1.friend_id = f2.user_id
+            WHERE f2.friend_id = (SELECT id FROM IdMap WHERE kind = 'user' AND yelp_id = %(friend_user_id)s)
+               AND f2.friend_id NOT IN (SELECT friend_id FROM Friends
+                                        WHERE user_id = (SELECT id FROM IdMap
+                                                         WHERE kind = 'user' AND yelp_id = %(friend_user_id)s))""",
+    },
+    'q12_friends_of_friends_set_based_int_keys': {
+        'description': "The set based query #12 on the integer key schema",
+        'variant_of': 'q12_friends_of_friends_set_based',
+        'int_keys': True,
+        'sql': """
+            SELECT DISTINCT f2.friend_id
+            FROM IdMap m
+            JOIN Friends f1 ON f1.user_id = m.id
+            JOIN Friends f2 ON f2.user_id = f1.friend_id
+            LEFT JOIN Friends direct ON direct.user_id = f1.user_id AND direct.friend_id = f2.friend_id
+            WHERE m.kind = 'user' AND m.yelp_id = %(friend_user_id)s
+              AND f2.friend_id <> f1.user_id
+              AND direct.user_id IS NULL""",
+    },
+}
+
+# The GROUP BY queries again, run as parallel partial aggregates by mysql_scatter_gather.py
+for _name in AGGREGATIONS:
+    QUERIES[f"{_name}_scatter_gather"] = {
+        'description': QUERIES[_name]['description'] + " (scatter-gather over parallel connections)",
+        'variant_of': _name,
+        'scatter_gather': _name,
+    }
+
+DEFAULT_PARAMETERS = {
+    'city': 'Nashville',
+    'user_id': 'ximBNBichf7e8cABAd480A',
+    'friend_user_id': 'MfAo-QPgFrcziuygx27K5w',
+    'min_compliments': 100,
+    'min_tips': 5,
+    'user_prefix': 'A%',
+}
+
+
+def default_queries(int_keys: bool = False) -> List[str]:
+    """The queries that run on the string key or, with int_keys, the integer key schema; there the
+    int_keys variants replace the queries they are a variant of"""
+    if not int_keys:
+        return [name for name, query in QUERIES.items() if not query.get('int_keys')]
+    replaced = {query['variant_of'] for query in QUERIES.values() if query.get('int_keys')}
+    return [name for name, query in QUERIES.items() if name not in replaced and not query.get('string_keys')]
+
+
+def latency_stats(latencies: List[float]) -> Dict[str, float]:
+    values = np.array(latencies)
+    return {
+        'min': float(values.min()),
+        'median': float(np.median(values)),
+        'mean': float(values.mean()),
+        'p95': float(np.percentile(values, 95)),
+        'p99': float(np.percentile(values, 99)),
+        'max': float(values.max()),
+    }
+
+
+def run_query(cursor, sql: str, parameters: Dict[str, Any]) -> int:
+    """Execute a query and fetch its whole result; returns the number of rows"""
+    cursor.execute(sql, parameters)
+    return len(cursor.fetchall())
+
+
+def benchmark_query(connection, name: str, parameters: Dict[str, Any], warmups: int = 1,
+                    repetitions: int = 5, scatter_gather: Optional[ScatterGatherExecutor] = None) -> Dict[str, Any]:
+    """Time one query of QUERIES: warmups are run and discarded, then every repetition is timed
+    from execute until its last row has been fetched (or, for scatter-gather queries, merged)."""
+    query = QUERIES[name]
+    cursor = connection.cursor()
+    if 'scatter_gather' in query:
+        def run():
+            return len(scatter_gather.run(query['scatter_gather'], parameters))
+    else:
+        def run():
+            return run_query(cursor, query['sql'], parameters)
+    try:
+        for _ in range(warmups):
+            run()
+        latencies = []
+        rows = 0
+        for _ in range(repetitions):
+            start_time = time.perf_counter()
+            rows = run()
+            latencies.append(time.perf_counter() - start_time)
+    finally:
+        cursor.close()
+    return {'description': QUERIES[name]['description'], 'variant_of': QUERIES[name].get('variant_of'),
+            'rows': rows, 'latencies': latencies, **latency_stats(latencies)}
+
+
+def run_benchmark(config: Dict[str, Any], names: Optional[List[str]] = None, parameters: Optional[Dict] = None,
+                  warmups: int = 1, repetitions: int = 5, profile: Optional[str] = None,
+                  parallel_workers: int = 4, split: str = 'range', int_keys: bool = False) -> Dict[str, Any]:
+    """Run the queries once; profile: schema profile to switch the tables to first (None keeps the current one)
+    parallel_workers, split: number of connections and slicing of the scatter-gather variants
+    int_keys: the tables were loaded with mysql_loader.py --int-keys (selects the default queries)"""
+    names = names or default_queries(int_keys)
+    profile_time = MySQLLoader(config, int_keys=int_keys).apply_profile(profile) if profile else None
+    parameters = dict(DEFAULT_PARAMETERS, **(parameters or {}))
+    connection = mysql.connector.connect(**config)
+    scatter_gather = None
+    if any('scatter_gather' in QUERIES[name] for name in names):
+        scatter_gather = ScatterGatherExecutor(config, workers=parallel_workers, split=split)
+    results = {}
+    try:
+        for name in names:
+            try:
+                results[name] = benchmark_query(connection, name, parameters, warmups, repetitions, scatter_gather)
+            except mysql.connector.ProgrammingError as e:
+                # e.g. the summary variants when the data was loaded without --summaries
+                results[name] = {'description': QUERIES[name]['description'], 'error': str(e)}
+                print(f"{name}: {e}")
+                continue
+            print(f"{name}: {results[name]['rows']:,} rows, min {results[name]['min']:.4f}s, "
+                  f"median {results[name]['median']:.4f}s, p95 {results[name]['p95']:.4f}s, "
+                  f"p99 {results[name]['p99']:.4f}s")
+    finally:
+        connection.close()
+        if scatter_gather:
+            scatter_gather.close()
+    return {'database': config.get('database'), 'profile': profile, 'profile_time': profile_time,
+            'int_keys': int_keys, 'warmups': warmups, 'repetitions': repetitions, 'parameters': parameters,
+            'parallel_workers': parallel_workers, 'split': split, 'queries': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time queries #1-#12 of mysql_bulkload.sql")
+    add_connection_arguments(parser)
+    parser.add_argument('--queries', nargs='+', default=None, choices=list(QUERIES),
+                        help="queries to run (default: all that apply to the schema)")
+    parser.add_argument('--warmups', type=int, default=1, help="untimed runs before the timed ones")
+    parser.add_argument('--repetitions', type=int, default=5, help="timed runs per query")
+    parser.add_argument('--city', default=DEFAULT_PARAMETERS['city'], help="city of query #1")
+    parser.add_argument('--user-id', default=DEFAULT_PARAMETERS['user_id'], help="user of query #3")
+    parser.add_argument('--friend-user-id', default=DEFAULT_PARAMETERS['friend_user_id'], help="user of query #12")
+    parser.add_argument('--user-prefix', default=DEFAULT_PARAMETERS['user_prefix'],
+                        help="LIKE pattern of the users in q12_friends_of_friends_all_users")
+    parser.add_argument('--profiles', nargs='+', default=None, choices=list(SCHEMA_PROFILES),
+                        help="schema profiles to switch to and benchmark in turn (default: the current schema)")
+    parser.add_argument('--parallel-workers', type=int, default=4,
+                        help="connections used by the scatter-gather variants")
+    parser.add_argument('--split', default='range', choices=SPLIT_MODES,
+                        help="how the scatter-gather variants slice the tables: key ranges or CRC32 hash")
+    parser.add_argument('--int-keys', action='store_true',
+                        help="the tables were loaded with mysql_loader.py --int-keys: run the IdMap variants of "
+                             "#3 and #12 instead")
+    parser.add_argument('--output', default="mysql_benchmark.json", help="JSON file for the results")
+    args = parser.parse_args()
+
+    parameters = {'city': args.city, 'user_id': args.user_id, 'friend_user_id': args.friend_user_id,
+                  'user_prefix': args.user_prefix}
+    results = {}
+    for profile in args.profiles or [None]:
+        results[profile or 'current'] = run_benchmark(connection_config(args), args.queries, parameters,
+                                                      warmups=args.warmups, repetitions=args.repetitions,
+                                                      profile=profile, parallel_workers=args.parallel_workers,
+                                                      split=args.split, int_keys=args.int_keys)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
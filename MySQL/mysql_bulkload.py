@@ -1,30 +1,23 @@
+import argparse
 import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Any, Iterator, Optional
 
-# business
-input_file = "yelp_academic_dataset_business.json"
-output_file = "yelp_academic_dataset_business.dat"
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'Dataset'))
+from jsonUtils import decode_json_line
 
-with open(input_file, "r", encoding="utf-8") as f:
-    data = [json.loads(line) for line in f]
-
-
-fields = [
+business_fields = [
     "business_id", "name", "address", "city", "state",
     "postal_code", "latitude", "longitude", "stars",
     "review_count", "is_open"
 ]
 
-with open(output_file, "w", encoding="utf-8") as f:
-    for item in data:
-        row = "|".join([str(item.get(field, "")).replace('®', '').replace('|', ' ') for field in fields])
-        f.write(row + "\n")
-
-
-# review
-review_input_file = "yelp_academic_dataset_review.json"
-review_output_file = "yelp_academic_dataset_review.dat"
-with open(review_input_file, "r", encoding="utf-8") as f:
-    review_data = [json.loads(line) for line in f]
+# Flattened into the MONDAY..SUNDAY columns of the business table
+weekdays = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
 
 review_fields = [
     "review_id", "user_id", "business_id", "stars",
@@ -33,18 +26,6 @@ review_fields = [
     "useful", "funny", "cool"
 ]
 
-with open(review_output_file, "w", encoding="utf-8") as f:
-    for item in review_data:
-        row = "|".join([str(item.get(field, "")).replace('|', ' ') for field in review_fields])
-        f.write(row + "\n")
-
-# user
-user_input_file = "yelp_academic_dataset_user.json"
-user_output_file = "yelp_academic_dataset_user.dat"
-
-with open(user_input_file, "r", encoding="utf-8") as f:
-    user_data = [json.loads(line) for line in f]
-
 user_fields = [
     "user_id", "name", "review_count", "yelping_since",
     "useful", "funny", "cool", "fans",
@@ -54,9 +35,144 @@ user_fields = [
     "compliment_funny", "compliment_writer", "compliment_photos"
 ]
 
-with open(user_output_file, "w", encoding="utf-8") as f:
+tip_fields = ["user_id", "business_id", "text", "date", "compliment_count"]
+
+WRITE_BUFFER = 1024 * 1024
+
+
+def read_json_lines(input_file: str) -> Iterator[Dict[str, Any]]:
+    """Stream the records of a JSONL file one at a time"""
+    with open(input_file, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('//'):  # Skip empty lines and comment lines
+                continue
+            try:
+                yield decode_json_line(line)
+            except json.JSONDecodeError as e:
+                print(f"Error parsing line in {input_file}: {str(e)}")
+
+
+def clean_field(value: Any) -> str:
+    """Format a value for a '|' separated LOAD DATA row"""
+    if value is None:
+        return ""
+    # '\' is LOAD DATA's escape character, and '|' and line breaks would split the row
+    return (str(value).replace('\\', '\\\\').replace('|', ' ')
+            .replace('\r', ' ').replace('\n', ' '))
+
+
+def format_row(item: Dict[str, Any], fields: List[str]) -> str:
+    return "|".join(clean_field(item.get(field, "")) for field in fields) + "\n"
+
+
+def split_list(value: Any) -> List[str]:
+    """Yelp stores categories and friends either as a list or as a ', ' separated string ('None' if empty)"""
+    if not value or value == "None":
+        return []
+    if isinstance(value, str):
+        return [part.strip() for part in value.split(",") if part.strip()]
+    return [str(part) for part in value]
+
+
+def convert_businesses(input_file: str, business_output: str, category_output: str) -> Dict[str, int]:
+    """Write business rows (with the hours flattened into one column per weekday) and category rows"""
+    businesses = categories = 0
+    with open(business_output, "w", encoding="utf-8", buffering=WRITE_BUFFER) as business_file, \
+            open(category_output, "w", encoding="utf-8", buffering=WRITE_BUFFER) as category_file:
+        for item in read_json_lines(input_file):
+            hours = item.get("hours") or {}
+            row = [clean_field(item.get(field, "")).replace('®', '') for field in business_fields]
+            row += [clean_field(hours.get(day, "")) for day in weekdays]
+            business_file.write("|".join(row) + "\n")
+            businesses += 1
+
+            business_id = clean_field(item["business_id"])
+            for category in split_list(item.get("categories")):
+                category_file.write(f"{business_id}|{clean_field(category)}\n")
+                categories += 1
+    return {business_output: businesses, category_output: categories}
+
+
+def convert_users(input_file: str, user_output: str, friends_output: str) -> Dict[str, int]:
+    """Write user rows and one friends row per (user, friend) pair"""
+    users = friends = 0
+    with open(user_output, "w", encoding="utf-8", buffering=WRITE_BUFFER) as user_file, \
+            open(friends_output, "w", encoding="utf-8", buffering=WRITE_BUFFER) as friends_file:
+        for item in read_json_lines(input_file):
+            user_file.write(format_row(item, user_fields))
+            users += 1
+
+            user_id = clean_field(item["user_id"])
+            for friend_id in split_list(item.get("friends")):
+                friends_file.write(f"{user_id}|{clean_field(friend_id)}\n")
+                friends += 1
+    return {user_output: users, friends_output: friends}
+
+
+def convert_rows(input_file: str, output_file: str, fields: List[str]) -> Dict[str, int]:
+    """Write one row per record with the given fields (tips, reviews, delta friend edges)"""
+    rows = 0
+    with open(output_file, "w", encoding="utf-8", buffering=WRITE_BUFFER) as f:
+        for item in read_json_lines(input_file):
+            f.write(format_row(item, fields))
+            rows += 1
+    return {output_file: rows}
+
+
+def timed(function, *args) -> Dict[str, Any]:
+    start_time = time.time()
+    counts = function(*args)
+    return {'input': args[0], 'rows': counts, 'time': time.time() - start_time}
+
+
+def convert_all(prefix: str, users: Optional[str] = None, businesses: Optional[str] = None,
+                tips: Optional[str] = None, reviews: Optional[str] = None, friend_edges: Optional[str] = None,
+                workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Convert every given JSONL file to the .dat files loaded by mysql_bulkload.sql, one file per process.
+
+    Outputs are <prefix>_businesses.dat, _categories.dat, _users.dat, _friends.dat, _tips.dat,
+    _reviews.dat and, for delta batches, _friend_edges.dat.
+    """
+    jobs = []
+    if businesses:
+        jobs.append((convert_businesses, businesses, f"{prefix}_businesses.dat", f"{prefix}_categories.dat"))
+    if users:
+        jobs.append((convert_users, users, f"{prefix}_users.dat", f"{prefix}_friends.dat"))
+    if tips:
+        jobs.append((convert_rows, tips, f"{prefix}_tips.dat", tip_fields))
+    if reviews:
+        jobs.append((convert_rows, reviews, f"{prefix}_reviews.dat", review_fields))
+    if friend_edges:
+        jobs.append((convert_rows, friend_edges, f"{prefix}_friend_edges.dat", ["user_id", "friend_id"]))
+
+    with ProcessPoolExecutor(max_workers=workers or min(len(jobs), os.cpu_count() or 1) or 1) as executor:
+        futures = [executor.submit(timed, *job) for job in jobs]
+        results = [future.result() for future in futures]
+    for result in results:
+        rows = ", ".join(f"{os.path.basename(path)}: {count:,}" for path, count in result['rows'].items())
+        print(f"{result['input']} -> {rows} rows in {result['time']:.2f} seconds")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert Yelp JSONL files to '|' separated .dat files for LOAD DATA")
+    parser.add_argument('--users', default=None, help="user JSONL file")
+    parser.add_argument('--businesses', default=None, help="business JSONL file")
+    parser.add_argument('--tips', default=None, help="tip JSONL file")
+    parser.add_argument('--reviews', default=None, help="review JSONL file (the review table is not loaded by default)")
+    parser.add_argument('--friend-edges', default=None, help="<preset>_delta<k>_friends.json of a delta batch")
+    parser.add_argument('--prefix', default="reduced", help="output file prefix, e.g. reduced or reduced_delta1")
+    parser.add_argument('--workers', type=int, default=None, help="number of files converted in parallel")
+    args = parser.parse_args()
+    if not any([args.users, args.businesses, args.tips, args.reviews, args.friend_edges]):
+        args.users = "yelp_academic_dataset_user.json"
+        args.businesses = "yelp_academic_dataset_business.json"
+        args.tips = "yelp_academic_dataset_tip.json"
+
+    convert_all(args.prefix, users=args.users, businesses=args.businesses, tips=args.tips, reviews=args.reviews,
+                friend_edges=args.friend_edges, workers=args.workers)
+
 
-    for item in user_data:
-        print(len(item["friend"]))
-        row = "|".join([str(item.get(field, "")).replace('|', ' ') for field in user_fields])
-        f.write(row + "\n")
+if __name__ == "__main__":
+    main()
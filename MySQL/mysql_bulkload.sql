@@ -237,46 +237,13 @@ WHERE friend_id IN (
     WHERE user_id LIKE 'A%'
 );
 
-DELIMITER //
-
-CREATE TEMPORARY TABLE temp_results (
-    user_id VARCHAR(255),
-    friend_id VARCHAR(255)
-);
-DROP PROCEDURE IF EXISTS GetFriendsOfFriends;
-
-CREATE PROCEDURE GetFriendsOfFriends()
-BEGIN
-    DECLARE done INT DEFAULT FALSE;
-    DECLARE current_user_id VARCHAR(255);
-    DECLARE cur CURSOR FOR
-        SELECT DISTINCT user_id
-        FROM friends
-        WHERE user_id LIKE 'A%';
-    DECLARE CONTINUE HANDLER FOR NOT FOUND SET done = TRUE;
-
-    OPEN cur;
-
-    read_loop: LOOP
-        FETCH cur INTO current_user_id;
-        IF done THEN
-            LEAVE read_loop;
-        END IF;
-
-        INSERT INTO temp_results (user_id, friend_id)
-#         SELECT DISTINCT f1.user_id, f2.friend_id
-#         FROM friends f1
-#         JOIN friends f2 ON f1.friend_id = f2.user_id
-#         WHERE f1.user_id = current_user_id;
-        SELECT DISTINCT f1.user_id, f2.friend_id
-        FROM Friends f1
-        JOIN Friends f2 ON f1.friend_id = f2.user_id
-        WHERE f2.friend_id = current_user_id;
-    END LOOP;
-
-    CLOSE cur;
-END //
-
-DELIMITER ;
-CALL GetFriendsOfFriends();
-SELECT * FROM temp_results;
+# Friends' friends that are not already friends, for every user starting with 'A', in one statement:
+# the two-hop self-join is filtered by an anti-join on the direct friends (all three probes use the
+# Friends primary key) instead of a cursor running one join per user into a temporary table
+SELECT DISTINCT f1.user_id, f2.friend_id
+FROM Friends f1
+JOIN Friends f2 ON f2.user_id = f1.friend_id
+LEFT JOIN Friends direct ON direct.user_id = f1.user_id AND direct.friend_id = f2.friend_id
+WHERE f1.user_id LIKE 'A%'
+  AND f2.friend_id <> f1.user_id
+  AND direct.user_id IS NULL;
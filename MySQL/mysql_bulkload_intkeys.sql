@@ -0,0 +1,153 @@
+# Integer key variant of mysql_bulkload.sql, for datasets generated with int_ids
+# (python generate_datasets.py --int-ids). user_id/business_id are dense integer surrogates and
+# <preset>_id_map.tsv maps them back to the original Yelp IDs.
+USE world;
+DROP TABLE IF EXISTS user;
+CREATE TABLE user (
+    user_id INT UNSIGNED PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    review_count INT NOT NULL,
+    yelping_since DATE NOT NULL,
+    useful INT NOT NULL,
+    funny INT NOT NULL,
+    cool INT NOT NULL,
+    fans INT NOT NULL,
+    average_stars FLOAT NOT NULL,
+    compliment_hot INT NOT NULL,
+    compliment_more INT NOT NULL,
+    compliment_profile INT NOT NULL,
+    compliment_cute INT NOT NULL,
+    compliment_list INT NOT NULL,
+    compliment_note INT NOT NULL,
+    compliment_plain INT NOT NULL,
+    compliment_cool INT NOT NULL,
+    compliment_funny INT NOT NULL,
+    compliment_writer INT NOT NULL,
+    compliment_photos INT NOT NULL
+);
+
+DROP TABLE IF EXISTS business;
+
+CREATE TABLE business (
+    business_id INT UNSIGNED PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    address VARCHAR(255) NOT NULL,
+    city VARCHAR(100) NOT NULL,
+    state CHAR(10) NOT NULL,
+    postal_code VARCHAR(20) NOT NULL,
+    latitude FLOAT NOT NULL,
+    longitude FLOAT NOT NULL,
+    stars FLOAT NOT NULL,
+    review_count INT NOT NULL,
+    is_open TINYINT NOT NULL,
+    MONDAY CHAR(10) NOT NULL,
+    TUESDAY CHAR(10) NOT NULL,
+    WEDNESDAY CHAR(10) NOT NULL,
+    THURSDAY CHAR(10) NOT NULL,
+    FRIDAY CHAR(10) NOT NULL,
+    SATURDAY CHAR(10) NOT NULL,
+    SUNDAY CHAR(10) NOT NULL
+);
+
+DROP TABLE IF EXISTS tip;
+CREATE TABLE tip (
+    user_id INT UNSIGNED NOT NULL,
+    business_id INT UNSIGNED NOT NULL,
+    text TEXT NOT NULL,
+    date DATETIME NOT NULL,
+    compliment_count INT NOT NULL,
+    PRIMARY KEY (user_id, business_id, date)
+);
+
+DROP TABLE IF EXISTS Category;
+CREATE TABLE Category (
+    business_id INT UNSIGNED NOT NULL,
+    category VARCHAR(100) NOT NULL,
+    PRIMARY KEY (business_id, category),
+    FOREIGN KEY (business_id) REFERENCES Business(business_id)
+);
+
+DROP TABLE IF EXISTS Friends;
+CREATE TABLE Friends (
+    user_id INT UNSIGNED NOT NULL,
+    friend_id INT UNSIGNED NOT NULL,
+    PRIMARY KEY (user_id, friend_id)
+);
+
+# Surrogate key -> original Yelp ID, for queries that look up a user or business by its Yelp ID
+DROP TABLE IF EXISTS IdMap;
+CREATE TABLE IdMap (
+    kind ENUM('user', 'business') NOT NULL,
+    id INT UNSIGNED NOT NULL,
+    yelp_id CHAR(22) NOT NULL,
+    PRIMARY KEY (kind, id),
+    UNIQUE KEY (kind, yelp_id)
+);
+
+
+SHOW VARIABLES LIKE 'secure_file_priv';
+
+
+LOAD DATA INFILE 'C:\\ProgramData\\MySQL\\MySQL Server 8.3\\Uploads\\reduced_users.dat'
+INTO TABLE user
+FIELDS TERMINATED BY '|'
+LINES TERMINATED BY '\n'
+(user_id, name, review_count, yelping_since, useful, funny, cool, fans, average_stars,
+ compliment_hot, compliment_more, compliment_profile, compliment_cute,
+ compliment_list, compliment_note, compliment_plain, compliment_cool,
+ compliment_funny, compliment_writer, compliment_photos);
+
+
+DELETE FROM business;
+
+LOAD DATA INFILE 'C:\\ProgramData\\MySQL\\MySQL Server 8.3\\Uploads\\reduced_businesses.dat'
+IGNORE
+INTO TABLE business
+FIELDS TERMINATED BY '|'
+LINES TERMINATED BY '\n'
+(business_id, name, address, city, state, postal_code, latitude, longitude, stars, review_count, is_open,
+ Monday, Tuesday, Wednesday, Thursday, Friday, Saturday, Sunday);
+
+LOAD DATA INFILE 'C:\\ProgramData\\MySQL\\MySQL Server 8.3\\Uploads\\reduced_tips.dat'
+INTO TABLE Tip
+FIELDS TERMINATED BY '|'
+LINES TERMINATED BY '\n'
+(user_id, business_id, text, @date, compliment_count)
+SET date = STR_TO_DATE(@date, '%Y-%m-%d %H:%i:%s');
+
+LOAD DATA INFILE 'C:\\ProgramData\\MySQL\\MySQL Server 8.3\\Uploads\\reduced_categories.dat'
+IGNORE
+INTO TABLE Category
+FIELDS TERMINATED BY '|'
+LINES TERMINATED BY '\n'
+(business_id, category);
+
+LOAD DATA INFILE 'C:\\ProgramData\\MySQL\\MySQL Server 8.3\\Uploads\\reduced_friends.dat'
+IGNORE
+INTO TABLE Friends
+FIELDS TERMINATED BY '|'
+LINES TERMINATED BY '\n'
+(user_id, friend_id);
+
+LOAD DATA INFILE 'C:\\ProgramData\\MySQL\\MySQL Server 8.3\\Uploads\\reduced_id_map.tsv'
+INTO TABLE IdMap
+FIELDS TERMINATED BY '\t'
+LINES TERMINATED BY '\n'
+(kind, id, yelp_id);
+
+
+# Queries #1, #2, #4-#11 of mysql_bulkload.sql run unchanged on this schema.
+# #3 and #12 take a Yelp user ID, so they translate it through IdMap first.
+
+#3 Find a user's all review
+SELECT Tip.*
+FROM Tip
+WHERE user_id = (SELECT id FROM IdMap WHERE kind = 'user' AND yelp_id = 'ximBNBichf7e8cABAd480A');
+
+#12 Find a person’s friends’ friends but not the person’s friends
+SELECT DISTINCT f2.friend_id
+FROM Friends f1
+JOIN Friends f2 ON f1.friend_id = f2.user_id
+WHERE f2.friend_id = (SELECT id FROM IdMap WHERE kind = 'user' AND yelp_id = 'MfAo-QPgFrcziuygx27K5w')
+   AND f2.friend_id NOT IN (SELECT friend_id FROM Friends
+                            WHERE user_id = (SELECT id FROM IdMap WHERE kind = 'user' AND yelp_id = 'MfAo-QPgFrcziuygx27K5w'));
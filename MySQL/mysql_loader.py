@@ -0,0 +1,528 @@
+import argparse
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+import mysql.connector
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'Dataset'))
+from datasetUtils import split_file_ranges
+
+# Same tables as mysql_bulkload.sql, but only with their primary keys: the Category foreign key and the
+# secondary indexes of the schema profile are built once the data is in
+SCHEMA = {
+    'user': """
+        CREATE TABLE user (
+            user_id CHAR(22) PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            review_count INT NOT NULL,
+            yelping_since DATE NOT NULL,
+            useful INT NOT NULL,
+            funny INT NOT NULL,
+            cool INT NOT NULL,
+            fans INT NOT NULL,
+            average_stars FLOAT NOT NULL,
+            compliment_hot INT NOT NULL,
+            compliment_more INT NOT NULL,
+            compliment_profile INT NOT NULL,
+            compliment_cute INT NOT NULL,
+            compliment_list INT NOT NULL,
+            compliment_note INT NOT NULL,
+            compliment_plain INT NOT NULL,
+            compliment_cool INT NOT NULL,
+            compliment_funny INT NOT NULL,
+            compliment_writer INT NOT NULL,
+            compliment_photos INT NOT NULL
+        )""",
+    'business': """
+        CREATE TABLE business (
+            business_id CHAR(22) PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            address VARCHAR(255) NOT NULL,
+            city VARCHAR(100) NOT NULL,
+            state CHAR(10) NOT NULL,
+            postal_code VARCHAR(20) NOT NULL,
+            latitude FLOAT NOT NULL,
+            longitude FLOAT NOT NULL,
+            stars FLOAT NOT NULL,
+            review_count INT NOT NULL,
+            is_open TINYINT NOT NULL,
+            MONDAY CHAR(10) NOT NULL,
+            TUESDAY CHAR(10) NOT NULL,
+            WEDNESDAY CHAR(10) NOT NULL,
+            THURSDAY CHAR(10) NOT NULL,
+            FRIDAY CHAR(10) NOT NULL,
+            SATURDAY CHAR(10) NOT NULL,
+            SUNDAY CHAR(10) NOT NULL
+        )""",
+    'tip': """
+        CREATE TABLE tip (
+            user_id VARCHAR(50) NOT NULL,
+            business_id VARCHAR(50) NOT NULL,
+            text TEXT NOT NULL,
+            date DATETIME NOT NULL,
+            compliment_count INT NOT NULL,
+            PRIMARY KEY (user_id, business_id, date)
+        )""",
+    'Category': """
+        CREATE TABLE Category (
+            business_id VARCHAR(50) NOT NULL,
+            category VARCHAR(100) NOT NULL,
+            PRIMARY KEY (business_id, category)
+        )""",
+    'Friends': """
+        CREATE TABLE Friends (
+            user_id VARCHAR(50) NOT NULL,
+            friend_id VARCHAR(50) NOT NULL,
+            PRIMARY KEY (user_id, friend_id)
+        )""",
+}
+
+# Integer key variant of SCHEMA for datasets generated with --int-ids, as in mysql_bulkload_intkeys.sql:
+# user_id/business_id are dense integer surrogates, and IdMap maps them back to the Yelp IDs
+def int_key_ddl(create: str) -> str:
+    return re.sub(r"\b(user_id|business_id|friend_id) (CHAR\(22\)|VARCHAR\(50\))", r"\1 INT UNSIGNED", create)
+
+
+INT_KEY_SCHEMA = {table: int_key_ddl(create) for table, create in SCHEMA.items()}
+INT_KEY_SCHEMA['IdMap'] = """
+        CREATE TABLE IdMap (
+            kind ENUM('user', 'business') NOT NULL,
+            id INT UNSIGNED NOT NULL,
+            yelp_id CHAR(22) NOT NULL,
+            PRIMARY KEY (kind, id),
+            UNIQUE KEY (kind, yelp_id)
+        )"""
+
+FOREIGN_KEYS = [
+    "ALTER TABLE Category ADD FOREIGN KEY (business_id) REFERENCES business(business_id)",
+]
+
+# Secondary indexes (name, table, columns) that let the benchmark queries read an index instead of the table
+COVERING_INDEXES = [
+    ('business_city_stars', 'business', "city, stars, review_count, name"),  # #1: filter, order and result
+    ('tip_business_compliments', 'tip', "business_id, compliment_count"),  # #7, #8, #9, #10: join and SUM
+    ('category_category', 'Category', "category, business_id"),  # #7, #9, #10: GROUP BY category
+    ('friends_friend', 'Friends', "friend_id, user_id"),  # #12: probe by friend_id
+]
+
+PARTITIONS = 8
+
+# Physical designs the loader can build and the benchmark can switch between:
+#   baseline     primary keys only, as in mysql_bulkload.sql
+#   indexed      plus the covering indexes
+#   partitioned  indexed, with tip and Friends hash partitioned by user_id
+SCHEMA_PROFILES = {
+    'baseline': {'indexes': [], 'partitions': {}},
+    'indexed': {'indexes': COVERING_INDEXES, 'partitions': {}},
+    'partitioned': {'indexes': COVERING_INDEXES,
+                    'partitions': {'tip': f"PARTITION BY KEY (user_id) PARTITIONS {PARTITIONS}",
+                                   'Friends': f"PARTITION BY KEY (user_id) PARTITIONS {PARTITIONS}"}},
+}
+
+# Compliment totals per category and per (category, business), so the category leaderboards (#7, #9, #10)
+# read one row per category instead of joining Category with every tip
+SUMMARY_TABLES = {
+    'CategorySummary': """
+        CREATE TABLE CategorySummary (
+            category VARCHAR(100) PRIMARY KEY,
+            total_compliments BIGINT NOT NULL,
+            tip_count INT NOT NULL,
+            INDEX (total_compliments)
+        )""",
+    'CategoryBusinessSummary': """
+        CREATE TABLE CategoryBusinessSummary (
+            category VARCHAR(100) NOT NULL,
+            business_id VARCHAR(50) NOT NULL,
+            total_compliments BIGINT NOT NULL,
+            tip_count INT NOT NULL,
+            PRIMARY KEY (category, business_id),
+            INDEX (category, total_compliments)
+        )""",
+}
+
+SUMMARY_REFRESH = [
+    "DELETE FROM CategorySummary",
+    "DELETE FROM CategoryBusinessSummary",
+    """INSERT INTO CategoryBusinessSummary (category, business_id, total_compliments, tip_count)
+       SELECT c.category, t.business_id, SUM(t.compliment_count), COUNT(*)
+       FROM Category c
+       JOIN tip t ON c.business_id = t.business_id
+       GROUP BY c.category, t.business_id""",
+    """INSERT INTO CategorySummary (category, total_compliments, tip_count)
+       SELECT category, SUM(total_compliments), SUM(tip_count)
+       FROM CategoryBusinessSummary
+       GROUP BY category""",
+]
+
+
+def summary_change(row: str, sign: str) -> List[str]:
+    """Statements adding (sign '+') or removing (sign '-') the tip NEW/OLD to the totals of its categories"""
+    negate = '-' if sign == '-' else ''
+    return [
+        f"""INSERT INTO CategoryBusinessSummary (category, business_id, total_compliments, tip_count)
+            SELECT category, {row}.business_id, {negate}{row}.compliment_count, {negate}1
+            FROM Category WHERE business_id = {row}.business_id
+            ON DUPLICATE KEY UPDATE total_compliments = total_compliments {sign} {row}.compliment_count,
+                                    tip_count = tip_count {sign} 1;""",
+        f"""INSERT INTO CategorySummary (category, total_compliments, tip_count)
+            SELECT category, {negate}{row}.compliment_count, {negate}1
+            FROM Category WHERE business_id = {row}.business_id
+            ON DUPLICATE KEY UPDATE total_compliments = total_compliments {sign} {row}.compliment_count,
+                                    tip_count = tip_count {sign} 1;""",
+    ]
+
+
+SUMMARY_TRIGGERS = {
+    'tip_summary_insert': ('AFTER INSERT', summary_change('NEW', '+')),
+    'tip_summary_update': ('AFTER UPDATE', summary_change('OLD', '-') + summary_change('NEW', '+')),
+    'tip_summary_delete': ('AFTER DELETE', summary_change('OLD', '-')),
+}
+
+SUMMARY_MODES = ['triggers', 'refresh']
+
+# .dat files written by mysql_bulkload.py: (file suffix, table, column list, SET clause, IGNORE duplicates)
+DAT_FILES = [
+    ('users', 'user',
+     "(user_id, name, review_count, yelping_since, useful, funny, cool, fans, average_stars, "
+     "compliment_hot, compliment_more, compliment_profile, compliment_cute, compliment_list, compliment_note, "
+     "compliment_plain, compliment_cool, compliment_funny, compliment_writer, compliment_photos)", "", False),
+    ('businesses', 'business',
+     "(business_id, name, address, city, state, postal_code, latitude, longitude, stars, review_count, is_open, "
+     "MONDAY, TUESDAY, WEDNESDAY, THURSDAY, FRIDAY, SATURDAY, SUNDAY)", "", True),
+    ('tips', 'tip', "(user_id, business_id, text, @date, compliment_count)",
+     "SET date = STR_TO_DATE(@date, '%Y-%m-%d %H:%i:%s')", False),
+    ('categories', 'Category', "(business_id, category)", "", True),
+    ('friends', 'Friends', "(user_id, friend_id)", "", True),
+    ('friend_edges', 'Friends', "(user_id, friend_id)", "", True),
+]
+
+# <preset>_id_map.tsv written by generate_datasets.py --int-ids, loaded with the integer key schema
+ID_MAP_FILE = ('id_map', 'IdMap', "(kind, id, yelp_id)", "", False)
+
+
+class MySQLLoader:
+    """Load the .dat files of one prefix into MySQL over several connections.
+
+    Each file is split into newline-aligned chunks of about chunk_bytes, and every connection takes
+    the next chunk off a shared queue and runs LOAD DATA LOCAL INFILE on it. Unique and foreign key
+    checks are off for the load, and the foreign key and secondary indexes are built afterwards.
+    With int_keys the tables get the integer keys of INT_KEY_SCHEMA and <prefix>_id_map.tsv is
+    loaded into IdMap.
+    """
+
+    def __init__(self, connection_config: Dict[str, Any], workers: int = 4, chunk_bytes: int = 64 * 1024 * 1024,
+                 chunk_dir: Optional[str] = None, profile: str = 'indexed', int_keys: bool = False):
+        self.connection_config = dict(connection_config, allow_local_infile=True)
+        self.profile = profile
+        self.int_keys = int_keys
+        self.schema = INT_KEY_SCHEMA if int_keys else SCHEMA
+        self.workers = workers
+        self.chunk_bytes = chunk_bytes
+        self.chunk_dir = chunk_dir
+        self.setup_logging()
+
+    def setup_logging(self):
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(message)s',
+            handlers=[
+                logging.FileHandler('mysql_loader.log'),
+                logging.StreamHandler()
+            ]
+        )
+        self.logger = logging.getLogger(__name__)
+
+    def connect(self):
+        """A connection with the bulk load session settings"""
+        connection = mysql.connector.connect(**self.connection_config)
+        cursor = connection.cursor()
+        cursor.execute("SET SESSION unique_checks = 0")
+        cursor.execute("SET SESSION foreign_key_checks = 0")
+        try:
+            cursor.execute("SET SESSION sql_log_bin = 0")  # needs SYSTEM_VARIABLES_ADMIN or SUPER
+        except mysql.connector.Error as e:
+            self.logger.warning(f"Binary logging stays on: {e}")
+        cursor.close()
+        return connection
+
+    def execute_all(self, statements: List[str]):
+        connection = self.connect()
+        cursor = connection.cursor()
+        for statement in statements:
+            cursor.execute(statement)
+            if cursor.with_rows:  # ANALYZE TABLE returns a status row
+                cursor.fetchall()
+        connection.commit()
+        cursor.close()
+        connection.close()
+
+    def set_redo_log(self, enabled: bool) -> bool:
+        """Enable or disable InnoDB redo logging (MySQL 8.0.21+, needs INNODB_REDO_LOG_ENABLE)"""
+        try:
+            self.execute_all([f"ALTER INSTANCE {'ENABLE' if enabled else 'DISABLE'} INNODB REDO_LOG"])
+            return True
+        except mysql.connector.Error as e:
+            self.logger.warning(f"Could not {'enable' if enabled else 'disable'} the redo log: {e}")
+            return False
+
+    def create_schema(self):
+        partitions = SCHEMA_PROFILES[self.profile]['partitions']
+        statements = [f"DROP TABLE IF EXISTS {table}" for table in self.schema]
+        statements += [f"{create} {partitions.get(table, '')}" for table, create in self.schema.items()]
+        self.execute_all(statements)
+
+    def build_deferred(self):
+        statements = FOREIGN_KEYS + [f"CREATE INDEX {name} ON {table} ({columns})"
+                                     for name, table, columns in SCHEMA_PROFILES[self.profile]['indexes']]
+        for statement in statements:
+            start_time = time.time()
+            self.execute_all([statement])
+            self.logger.info(f"{statement}: {time.time() - start_time:.2f} seconds")
+        self.execute_all([f"ANALYZE TABLE {table}" for table in self.schema])
+
+    def create_summaries(self, mode: str):
+        """Build the summary tables from the loaded data and keep them current either with triggers on tip
+        (mode 'triggers') or by calling refresh_summaries() after each load (mode 'refresh')"""
+        statements = [f"DROP TRIGGER IF EXISTS {name}" for name in SUMMARY_TRIGGERS]
+        statements += [f"DROP TABLE IF EXISTS {table}" for table in SUMMARY_TABLES]
+        statements += [int_key_ddl(create) if self.int_keys else create for create in SUMMARY_TABLES.values()]
+        self.execute_all(statements)
+        self.refresh_summaries()
+        if mode == 'triggers':
+            # Created after the initial population, so the bulk load itself does not pay for them
+            self.execute_all([f"CREATE TRIGGER {name} {event} ON tip FOR EACH ROW BEGIN {' '.join(body)} END"
+                              for name, (event, body) in SUMMARY_TRIGGERS.items()])
+
+    def refresh_summaries(self):
+        """Recompute the summary tables from Category and tip (the batch alternative to the triggers)"""
+        start_time = time.time()
+        self.execute_all(SUMMARY_REFRESH)
+        self.logger.info(f"Refreshed the summary tables in {time.time() - start_time:.2f} seconds")
+
+    def apply_profile(self, profile: str) -> float:
+        """Switch the loaded tables to another schema profile; returns the time the DDL took"""
+        start_time = time.time()
+        connection = self.connect()
+        cursor = connection.cursor()
+        cursor.execute("SELECT table_name, index_name FROM information_schema.statistics "
+                       "WHERE table_schema = DATABASE()")
+        existing_indexes = {(table.lower(), name) for table, name in cursor.fetchall()}
+        cursor.execute("SELECT DISTINCT table_name FROM information_schema.partitions "
+                       "WHERE table_schema = DATABASE() AND partition_name IS NOT NULL")
+        partitioned_tables = {table.lower() for table, in cursor.fetchall()}
+        cursor.close()
+        connection.close()
+
+        wanted = SCHEMA_PROFILES[profile]
+        statements = []
+        for name, table, _ in dict.fromkeys(index for options in SCHEMA_PROFILES.values() for index in options['indexes']):
+            if (table.lower(), name) in existing_indexes:
+                statements.append(f"DROP INDEX {name} ON {table}")
+        for table in self.schema:
+            if table.lower() in partitioned_tables:
+                statements.append(f"ALTER TABLE {table} REMOVE PARTITIONING")
+            if table in wanted['partitions']:
+                statements.append(f"ALTER TABLE {table} {wanted['partitions'][table]}")
+        statements += [f"CREATE INDEX {name} ON {table} ({columns})" for name, table, columns in wanted['indexes']]
+        statements += [f"ANALYZE TABLE {table}" for table in self.schema]
+        self.execute_all(statements)
+        self.profile = profile
+        self.logger.info(f"Applied schema profile {profile} in {time.time() - start_time:.2f} seconds")
+        return time.time() - start_time
+
+    def plan_chunks(self, prefix: str) -> List[Tuple[str, Tuple, int, int]]:
+        """(path, file spec, start, end) for every chunk of the prefix's .dat files (and, with int_keys,
+        of its id map), largest files first"""
+        files = [(f"{prefix}_{spec[0]}.dat", spec) for spec in DAT_FILES]
+        if self.int_keys:
+            files.append((f"{prefix}_{ID_MAP_FILE[0]}.tsv", ID_MAP_FILE))
+        chunks = []
+        for path, spec in files:
+            if not os.path.exists(path):
+                continue
+            size = os.path.getsize(path)
+            for start, end in split_file_ranges(path, max(1, -(-size // self.chunk_bytes))):
+                chunks.append((path, spec, start, end))
+        chunks.sort(key=lambda chunk: os.path.getsize(chunk[0]), reverse=True)
+        return chunks
+
+    def load_chunk(self, cursor, path: str, spec: Tuple, start: int, end: int) -> Tuple[int, int]:
+        """LOAD DATA one byte range of a .dat file; returns (rows loaded, warnings)"""
+        _, table, columns, set_clause, ignore = spec
+        separator = '\\t' if path.endswith('.tsv') else '|'
+        chunk_path = path
+        if (start, end) != (0, os.path.getsize(path)):
+            # LOAD DATA LOCAL reads whole files, so the range is copied to a file of its own
+            fd, chunk_path = tempfile.mkstemp(suffix='.dat', dir=self.chunk_dir)
+            with open(path, 'rb') as source, os.fdopen(fd, 'wb') as chunk_file:
+                source.seek(start)
+                chunk_file.write(source.read(end - start))
+        try:
+            cursor.execute(
+                f"LOAD DATA LOCAL INFILE '{Path(chunk_path).resolve().as_posix()}' "
+                f"{'IGNORE' if ignore else ''} INTO TABLE {table} "
+                f"FIELDS TERMINATED BY '{separator}' LINES TERMINATED BY '\\n' {columns} {set_clause}")
+            rows = cursor.rowcount
+            cursor.execute("SHOW COUNT(*) WARNINGS")
+            warnings = cursor.fetchone()[0]
+        finally:
+            if chunk_path != path:
+                os.remove(chunk_path)
+        return rows, warnings
+
+    def load_files(self, prefix: str) -> Dict[str, Dict[str, Any]]:
+        chunks = queue.Queue()
+        for chunk in self.plan_chunks(prefix):
+            chunks.put(chunk)
+        stats: Dict[str, Dict[str, Any]] = {}
+        lock = threading.Lock()
+
+        def worker():
+            connection = self.connect()
+            cursor = connection.cursor()
+            try:
+                while True:
+                    try:
+                        path, spec, start, end = chunks.get_nowait()
+                    except queue.Empty:
+                        break
+                    chunk_start = time.time()
+                    rows, warnings = self.load_chunk(cursor, path, spec, start, end)
+                    connection.commit()
+                    chunk_end = time.time()
+                    with lock:
+                        file_stats = stats.setdefault(os.path.basename(path), {
+                            'table': spec[1], 'rows': 0, 'warnings': 0, 'chunks': 0,
+                            'first_start': chunk_start, 'last_end': chunk_end, 'chunk_time': 0.0})
+                        file_stats['rows'] += rows
+                        file_stats['warnings'] += warnings
+                        file_stats['chunks'] += 1
+                        file_stats['first_start'] = min(file_stats['first_start'], chunk_start)
+                        file_stats['last_end'] = max(file_stats['last_end'], chunk_end)
+                        file_stats['chunk_time'] += chunk_end - chunk_start
+            finally:
+                cursor.close()
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for future in [executor.submit(worker) for _ in range(self.workers)]:
+                future.result()
+
+        for name, file_stats in stats.items():
+            file_stats['time'] = file_stats.pop('last_end') - file_stats.pop('first_start')
+            self.logger.info(f"{name} -> {file_stats['table']}: {file_stats['rows']:,} rows in "
+                             f"{file_stats['chunks']} chunks, {file_stats['time']:.2f} seconds "
+                             f"({file_stats['warnings']:,} warnings)")
+        return stats
+
+    def load(self, prefix: str, append: bool = False, disable_redo_log: bool = False,
+             summaries: Optional[str] = None) -> Dict[str, Any]:
+        """Load <prefix>_*.dat and return the time of each phase.
+
+        append: load into the existing tables (e.g. a delta batch) instead of recreating them; the
+        deferred foreign key and indexes then already exist and are kept up to date by the load.
+        summaries: None, or how the category summary tables are kept current (see SUMMARY_MODES);
+        on append, 'refresh' recomputes them after the load and 'triggers' has nothing left to do.
+        """
+        timings: Dict[str, Any] = {'prefix': prefix, 'profile': self.profile, 'int_keys': self.int_keys,
+                                   'workers': self.workers, 'chunk_bytes': self.chunk_bytes}
+        total_start = time.time()
+        redo_log_disabled = disable_redo_log and self.set_redo_log(False)
+        timings['redo_log_disabled'] = redo_log_disabled
+        try:
+            if not append:
+                start_time = time.time()
+                self.create_schema()
+                timings['schema'] = time.time() - start_time
+
+            if self.int_keys and not append and not os.path.exists(f"{prefix}_{ID_MAP_FILE[0]}.tsv"):
+                self.logger.warning(f"No {prefix}_{ID_MAP_FILE[0]}.tsv, IdMap stays empty")
+            start_time = time.time()
+            timings['files'] = self.load_files(prefix)
+            timings['load'] = time.time() - start_time
+
+            if not append:
+                start_time = time.time()
+                self.build_deferred()
+                timings['deferred_ddl'] = time.time() - start_time
+
+            if summaries and not append:
+                start_time = time.time()
+                self.create_summaries(summaries)
+                timings['summaries'] = time.time() - start_time
+            elif summaries == 'refresh':
+                start_time = time.time()
+                self.refresh_summaries()
+                timings['summaries'] = time.time() - start_time
+        finally:
+            if redo_log_disabled:
+                self.set_redo_log(True)
+        timings['total'] = time.time() - total_start
+
+        for phase in ('schema', 'load', 'deferred_ddl', 'summaries', 'total'):
+            if phase in timings:
+                self.logger.info(f"{phase}: {timings[phase]:.2f} seconds")
+        return timings
+
+
+def add_connection_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--host', default="localhost")
+    parser.add_argument('--port', type=int, default=3306)
+    parser.add_argument('--user', default="root")
+    parser.add_argument('--password', default=os.environ.get('MYSQL_PWD', ""))
+    parser.add_argument('--database', default="world")
+
+
+def connection_config(args: argparse.Namespace) -> Dict[str, Any]:
+    return {'host': args.host, 'port': args.port, 'user': args.user, 'password': args.password,
+            'database': args.database}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load the .dat files of mysql_bulkload.py into MySQL in parallel")
+    parser.add_argument('--prefix', default="reduced", help=".dat file prefix, e.g. reduced or reduced_delta1")
+    add_connection_arguments(parser)
+    parser.add_argument('--workers', type=int, default=4, help="number of parallel connections")
+    parser.add_argument('--chunk-mb', type=int, default=64, help="size of the chunks each LOAD DATA reads")
+    parser.add_argument('--chunk-dir', default=None, help="directory for the temporary chunk files")
+    parser.add_argument('--profile', default='indexed', choices=list(SCHEMA_PROFILES),
+                        help="physical schema: baseline (primary keys only), indexed or partitioned")
+    parser.add_argument('--int-keys', action='store_true',
+                        help="integer key schema of mysql_bulkload_intkeys.sql, for datasets generated with "
+                             "--int-ids; also loads <prefix>_id_map.tsv into IdMap")
+    parser.add_argument('--append', action='store_true',
+                        help="load into the existing tables (delta batches) instead of recreating them")
+    parser.add_argument('--disable-redo-log', action='store_true',
+                        help="turn InnoDB redo logging off during the load (not crash safe)")
+    parser.add_argument('--summaries', default=None, choices=SUMMARY_MODES,
+                        help="build the category summary tables and keep them current with triggers on tip, "
+                             "or refresh them after every load")
+    parser.add_argument('--refresh-summaries', action='store_true',
+                        help="only recompute the summary tables from the loaded data")
+    parser.add_argument('--timings', default=None, help="write the phase timings to this JSON file")
+    args = parser.parse_args()
+
+    loader = MySQLLoader(connection_config(args), workers=args.workers, chunk_bytes=args.chunk_mb * 1024 * 1024,
+                         chunk_dir=args.chunk_dir, profile=args.profile, int_keys=args.int_keys)
+    if args.refresh_summaries:
+        loader.refresh_summaries()
+        return
+    timings = loader.load(args.prefix, append=args.append, disable_redo_log=args.disable_redo_log,
+                          summaries=args.summaries)
+    if args.timings:
+        with open(args.timings, 'w', encoding='utf-8') as f:
+            json.dump(timings, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
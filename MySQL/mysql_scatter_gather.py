@@ -0,0 +1,199 @@
+import argparse
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+
+import mysql.connector
+
+from mysql_loader import add_connection_arguments, connection_config
+
+# GROUP BY queries of mysql_bulkload.sql split into partial aggregates that each run on one slice of a table.
+#   sql          partial query; {where} is replaced by the predicate selecting the slice
+#   shard_table, shard_column, shard_expression
+#                the table and column the slices are cut from, and how the column is named in sql
+#   groups       number of leading group-by columns in the partial rows
+#   combine      how the remaining partial columns of one group are merged across slices
+#   finalize     turns a group and its merged partials into a result row
+#   order, limit applied to the merged rows, like the ORDER BY/LIMIT of the original query
+# When the slices are cut on the group-by key itself (#4, #6, #11), no group spans two slices and the
+# partial query can already apply HAVING and a top-k LIMIT.
+AGGREGATIONS = {
+    'q02_average_stars_per_city': {
+        'sql': "SELECT city, SUM(stars), COUNT(*) FROM business WHERE {where} GROUP BY city",
+        'shard_table': 'business', 'shard_column': 'business_id', 'shard_expression': 'business_id',
+        'groups': 1, 'combine': ['sum', 'sum'],
+        'finalize': lambda group, partials: group + (partials[0] / partials[1],),
+    },
+    'q04_tips_per_user': {
+        'sql': "SELECT user_id, COUNT(*) FROM tip WHERE {where} GROUP BY user_id",
+        'shard_table': 'tip', 'shard_column': 'user_id', 'shard_expression': 'user_id',
+        'groups': 1, 'combine': ['sum'],
+        'order': lambda row: -row[1],
+    },
+    'q06_top_complimented_users': {
+        'sql': "SELECT user_id, COUNT(*) AS tip_count, SUM(compliment_count) AS total_compliments "
+               "FROM tip WHERE {where} GROUP BY user_id "
+               "HAVING total_compliments > %(min_compliments)s ORDER BY tip_count DESC LIMIT 10",
+        'shard_table': 'tip', 'shard_column': 'user_id', 'shard_expression': 'user_id',
+        'groups': 1, 'combine': ['sum', 'sum'],
+        'order': lambda row: -row[1], 'limit': 10,
+    },
+    'q10_rank_categories': {
+        'sql': "SELECT c.category, SUM(t.compliment_count) FROM Category c "
+               "JOIN tip t ON c.business_id = t.business_id WHERE {where} GROUP BY c.category",
+        'shard_table': 'Category', 'shard_column': 'business_id', 'shard_expression': 'c.business_id',
+        'groups': 1, 'combine': ['sum'],
+        'order': lambda row: -row[1],
+    },
+    'q11_tips_per_user_year': {
+        'sql': "SELECT u.user_id, YEAR(t.date) AS year, COUNT(*) FROM tip t "
+               "JOIN user u ON t.user_id = u.user_id WHERE {where} GROUP BY u.user_id, YEAR(t.date)",
+        'shard_table': 'tip', 'shard_column': 'user_id', 'shard_expression': 't.user_id',
+        'groups': 2, 'combine': ['sum'],
+    },
+}
+
+COMBINE = {
+    'sum': lambda a, b: a + b,
+    'min': min,
+    'max': max,
+}
+
+SPLIT_MODES = ['range', 'hash']
+
+
+class ScatterGatherExecutor:
+    """Run the aggregations of AGGREGATIONS as one partial query per slice on a pool of at most
+    workers connections and merge the partial results client side.
+
+    split 'range' cuts the shard column into key ranges of about the same number of rows, so each
+    partial query is a range scan of the primary key or an index. split 'hash' selects the rows with
+    MOD(CRC32(column), slices) = i, which needs no boundaries but makes every partial query read the
+    whole table.
+    """
+
+    def __init__(self, connection_config: Dict[str, Any], workers: int = 4, slices: Optional[int] = None,
+                 split: str = 'range'):
+        self.connection_config = connection_config
+        self.idle: queue.Queue = queue.Queue()
+        self.connections: List[Any] = []  # every connection opened, idle or in use
+        self.lock = threading.Lock()
+        self.workers = workers
+        self.slices = slices or workers
+        self.split = split
+        self.boundaries: Dict[Tuple[str, str], List[Any]] = {}
+
+    def acquire(self):
+        """An idle connection, or a new one; at most one per thread of run() is ever in use"""
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            connection = mysql.connector.connect(**self.connection_config)
+            with self.lock:
+                self.connections.append(connection)
+            return connection
+
+    def execute(self, sql: str, parameters: Dict[str, Any]) -> List[Tuple]:
+        connection = self.acquire()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(sql, parameters)
+            rows = cursor.fetchall()
+            cursor.close()
+        finally:
+            self.idle.put(connection)
+        return rows
+
+    def close(self):
+        """Disconnect every connection the executor opened"""
+        with self.lock:
+            connections, self.connections = self.connections, []
+        self.idle = queue.Queue()
+        for connection in connections:
+            connection.close()
+
+    def range_boundaries(self, table: str, column: str) -> List[Any]:
+        """Keys that cut table into self.slices ranges of about equal row counts (cached per table and column)"""
+        if (table, column) not in self.boundaries:
+            count = self.execute(f"SELECT COUNT(*) FROM {table}", {})[0][0]
+            keys = []
+            for i in range(1, self.slices):
+                row = self.execute(f"SELECT {column} FROM {table} ORDER BY {column} LIMIT 1 OFFSET %(offset)s",
+                                   {'offset': count * i // self.slices})
+                if row and (not keys or row[0][0] != keys[-1]):
+                    keys.append(row[0][0])
+            self.boundaries[(table, column)] = keys
+        return self.boundaries[(table, column)]
+
+    def slice_predicates(self, spec: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+        """(WHERE predicate, parameters) for every slice of the shard column"""
+        expression = spec['shard_expression']
+        if self.split == 'hash':
+            return [(f"MOD(CRC32({expression}), {self.slices}) = {i}", {}) for i in range(self.slices)]
+
+        keys = self.range_boundaries(spec['shard_table'], spec['shard_column'])
+        if not keys:
+            return [("TRUE", {})]
+        predicates = [(f"{expression} < %(upper)s", {'upper': keys[0]})]
+        for lower, upper in zip(keys[:-1], keys[1:]):
+            predicates.append((f"{expression} >= %(lower)s AND {expression} < %(upper)s",
+                               {'lower': lower, 'upper': upper}))
+        predicates.append((f"{expression} >= %(lower)s", {'lower': keys[-1]}))
+        return predicates
+
+    def merge(self, spec: Dict[str, Any], partial_results: List[List[Tuple]]) -> List[Tuple]:
+        groups = spec['groups']
+        combine = [COMBINE[name] for name in spec['combine']]
+        merged: Dict[Tuple, List[Any]] = {}
+        for rows in partial_results:
+            for row in rows:
+                group, partials = tuple(row[:groups]), list(row[groups:])
+                if group in merged:
+                    merged[group] = [function(a, b) for function, a, b in zip(combine, merged[group], partials)]
+                else:
+                    merged[group] = partials
+
+        finalize = spec.get('finalize', lambda group, partials: group + tuple(partials))
+        rows = [finalize(group, partials) for group, partials in merged.items()]
+        if 'order' in spec:
+            rows.sort(key=spec['order'])
+        if 'limit' in spec:
+            rows = rows[:spec['limit']]
+        return rows
+
+    def run(self, name: str, parameters: Optional[Dict[str, Any]] = None) -> List[Tuple]:
+        """Run one aggregation of AGGREGATIONS in parallel and return the merged rows"""
+        spec = AGGREGATIONS[name]
+        jobs = [(spec['sql'].format(where=predicate), dict(parameters or {}, **slice_parameters))
+                for predicate, slice_parameters in self.slice_predicates(spec)]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            partial_results = list(executor.map(lambda job: self.execute(*job), jobs))
+        return self.merge(spec, partial_results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the GROUP BY queries of mysql_bulkload.sql as parallel "
+                                                 "partial aggregates merged client side")
+    add_connection_arguments(parser)
+    parser.add_argument('--queries', nargs='+', default=list(AGGREGATIONS), choices=list(AGGREGATIONS))
+    parser.add_argument('--workers', type=int, default=4, help="number of parallel connections")
+    parser.add_argument('--slices', type=int, default=None, help="number of partial queries (default: workers)")
+    parser.add_argument('--split', default='range', choices=SPLIT_MODES)
+    parser.add_argument('--min-compliments', type=int, default=100, help="HAVING threshold of query #6")
+    args = parser.parse_args()
+
+    executor = ScatterGatherExecutor(connection_config(args), workers=args.workers, slices=args.slices,
+                                     split=args.split)
+    try:
+        for name in args.queries:
+            start_time = time.perf_counter()
+            rows = executor.run(name, {'min_compliments': args.min_compliments})
+            print(f"{name}: {len(rows):,} rows in {time.perf_counter() - start_time:.4f} seconds")
+    finally:
+        executor.close()
+
+
+if __name__ == "__main__":
+    main()
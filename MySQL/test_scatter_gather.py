@@ -0,0 +1,74 @@
+import mysql_scatter_gather
+from mysql_scatter_gather import AGGREGATIONS, ScatterGatherExecutor
+
+
+def merge(name, partial_results):
+    return ScatterGatherExecutor({}, workers=2).merge(AGGREGATIONS[name], partial_results)
+
+
+def test_merge_averages_from_sums_and_counts():
+    rows = merge('q02_average_stars_per_city', [
+        [('Nashville', 8.0, 2), ('Tampa', 3.0, 1)],
+        [('Nashville', 4.0, 2)],
+    ])
+    assert sorted(rows) == [('Nashville', 3.0), ('Tampa', 3.0)]
+
+
+def test_merge_sums_groups_spanning_slices_and_orders():
+    rows = merge('q10_rank_categories', [
+        [('Food', 5), ('Bars', 7)],
+        [('Food', 4), ('Shopping', 1)],
+    ])
+    assert rows == [('Food', 9), ('Bars', 7), ('Shopping', 1)]
+
+
+def test_merge_keeps_the_top_k_of_all_slices():
+    partial_results = [[(f"user{slice_}_{i}", i, 100 + i) for i in range(10)] for slice_ in range(3)]
+    rows = merge('q06_top_complimented_users', partial_results)
+    assert len(rows) == 10
+    assert [tip_count for _, tip_count, _ in rows] == [9, 9, 9, 8, 8, 8, 7, 7, 7, 6]
+
+
+def test_merge_groups_on_several_columns():
+    rows = merge('q11_tips_per_user_year', [
+        [('u1', 2019, 2), ('u1', 2020, 1)],
+        [('u1', 2019, 3)],
+    ])
+    assert sorted(rows) == [('u1', 2019, 5), ('u1', 2020, 1)]
+
+
+def test_merge_of_no_rows():
+    assert merge('q04_tips_per_user', [[], []]) == []
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor()
+
+    def close(self):
+        self.closed = True
+
+
+class FakeCursor:
+    def execute(self, sql, parameters):
+        pass
+
+    def fetchall(self):
+        return [('Nashville', 4.0, 1)]
+
+    def close(self):
+        pass
+
+
+def test_close_disconnects_every_opened_connection(monkeypatch):
+    opened = []
+    monkeypatch.setattr(mysql_scatter_gather.mysql.connector, 'connect',
+                        lambda **config: opened.append(FakeConnection()) or opened[-1])
+    executor = ScatterGatherExecutor({}, workers=4, split='hash')
+    assert executor.run('q02_average_stars_per_city') == [('Nashville', 4.0)]
+    assert 1 <= len(opened) <= 4
+    executor.close()
+    assert all(connection.closed for connection in opened)
@@ -1,50 +1,13 @@
-import json
 import random
 import copy
-import re
-from typing import Dict, List, Tuple, Any
-
-
-def clean_json_string(json_str: str) -> str:
-    # Remove // comments
-    json_str = re.sub(r'//.*$', '', json_str)
-    # Remove any trailing commas before closing braces/brackets
-    json_str = re.sub(r',(\s*[}\]])', r'\1', json_str)
-    return json_str
-
-
-def load_jsonl_file(filename: str) -> Dict[str, Any]:
-    data = {}
-    with open(filename, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith('//'):  # Skip empty lines and comment lines
-                continue
-            try:
-                # Clean and parse each line
-                cleaned_line = clean_json_string(line)
-                obj = json.loads(cleaned_line)
-
-                # Each object should have an ID field
-                if 'business_id' in obj:
-                    data[obj['business_id']] = obj
-                elif 'user_id' in obj:
-                    data[obj['user_id']] = obj
-                elif 'text' in obj:  # for tips, create an artificial ID
-                    tip_id = str(hash(obj['text'] + obj['date']))
-                    data[tip_id] = obj
-
-            except json.JSONDecodeError as e:
-                print(f"Error parsing line in {filename}: {str(e)}")
-                print(f"Problematic line: {line[:100]}...")
-                continue
-    return data
-
-
-def save_jsonl_file(data: Dict[str, Any], filename: str):
-    with open(filename, 'w', encoding='utf-8') as f:
-        for item in data.values():
-            f.write(json.dumps(item) + '\n')
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'Dataset'))
+from datasetUtils import generate_friend_edges, load_jsonl_file, save_jsonl_file
 
 
 def generate_random_compliments() -> Dict[str, int]:
@@ -108,10 +71,10 @@ def generate_reduced_dataset():
 
     # Now update friends lists
     print("Generating friend relationships...")
-    for user_id in new_users:
-        num_friends = min(random.randint(0, 100), len(user_ids))
-        possible_friends = [uid for uid in user_ids if uid != user_id]
-        new_users[user_id]['friends'] = random.sample(possible_friends, num_friends)
+    friend_offsets, friend_targets = generate_friend_edges(len(user_ids), 100, fixed_friend=False)
+    friend_ids = np.array(user_ids, dtype=object)[friend_targets]
+    for index, user_id in enumerate(user_ids):
+        new_users[user_id]['friends'] = friend_ids[friend_offsets[index]:friend_offsets[index + 1]].tolist()
 
     print("Processing businesses...")
     # Process businesses
@@ -1,16 +1,27 @@
 from neo4j import GraphDatabase
 import json
+import sys
 from datetime import datetime
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import time
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'Dataset'))
+from jsonUtils import decode_json_line
+from batchTuner import BatchSizeTuner, FRIEND_SEPARATOR_BYTES
+from loadCheckpoint import LoadCheckpoint, iter_lines
+
 
 class Neo4jLoader:
-    def __init__(self, uri: str, user: str, password: str):
-        """Initialize Neo4j connection and set up logging."""
+    def __init__(self, uri: str, user: str, password: str, target_batch_seconds: Optional[float] = 0.5):
+        """Initialize Neo4j connection and set up logging.
+
+        target_batch_seconds: the batch sizes passed to the load methods are only the initial sizes and
+        adapt toward this transaction latency (None keeps them fixed; see BatchSizeTuner).
+        """
         self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.target_batch_seconds = target_batch_seconds
 
         # Set up logging
         logging.basicConfig(
@@ -27,6 +38,16 @@ class Neo4jLoader:
         """Close the Neo4j driver connection."""
         self.driver.close()
 
+    def batch_tuner(self, name: str, initial: int) -> BatchSizeTuner:
+        return BatchSizeTuner(name, initial, self.target_batch_seconds, min_size=1, logger=self.logger)
+
+    def write_batch(self, session, tuner: BatchSizeTuner, batch_bytes: int, work, *args):
+        """session.write_transaction(work, *args) for a batch, which is the last argument, timed for tuner"""
+        batch_start = time.perf_counter()
+        result = session.write_transaction(work, *args)
+        tuner.record(len(args[-1]), batch_bytes, time.perf_counter() - batch_start)
+        return result
+
     def clear_database(self):
         """Clear all nodes and relationships from the database."""
         with self.driver.session() as session:
@@ -101,12 +122,14 @@ class Neo4jLoader:
             result = tx.run(categories_query, batch=batch)
             return result.consume().counters.nodes_created
 
+        tuner = self.batch_tuner('Business', batch_size)
         batch = []
+        batch_bytes = 0
         try:
             with open(file_path, 'r', encoding='utf-8') as file, self.driver.session() as session:
                 for line in file:
                     try:
-                        business = json.loads(line.strip())
+                        business = decode_json_line(line.strip())
                     except json.JSONDecodeError as e:
                         self.logger.warning(f"Failed to parse JSON line: {e}")
                         continue
@@ -115,29 +138,38 @@ class Neo4jLoader:
                     business['hours'] = business.get('hours', {})
                     business['categories'] = business.get('categories', [])
                     batch.append(business)
+                    batch_bytes += len(line)
 
-                    if len(batch) >= batch_size:
+                    if tuner.full(len(batch), batch_bytes):
                         try:
-                            businesses_created += session.write_transaction(create_business_batch, batch)
+                            businesses_created += self.write_batch(session, tuner, batch_bytes,
+                                                                   create_business_batch, batch)
                             self.logger.info(f"Processed {businesses_created} businesses")
                         except Exception as e:
                             self.logger.error(f"Failed to process batch: {e}")
                         batch = []
+                        batch_bytes = 0
 
                 # Process remaining businesses
                 if batch:
                     try:
-                        businesses_created += session.write_transaction(create_business_batch, batch)
+                        businesses_created += self.write_batch(session, tuner, batch_bytes,
+                                                               create_business_batch, batch)
                     except Exception as e:
                         self.logger.error(f"Failed to process remaining batch: {e}")
 
         except FileNotFoundError as e:
             self.logger.error(f"File not found: {e}")
+        tuner.summary()
 
         self.logger.info(f"Completed business import. Total businesses created: {businesses_created}")
 
-    def load_users(self, file_path: str, batch_size: int = 1000):
-        """Load users from JSON file in batches with separate friend relationship handling."""
+    def load_users(self, file_path: str, batch_size: int = 1000, checkpoint_path: Optional[str] = None):
+        """Load users from JSON file in batches with separate friend relationship handling.
+
+        checkpoint_path: save the pass and byte offset reached after every committed batch (user nodes)
+        or user (friendships) to this file, and resume from there when it already exists.
+        """
         self.logger.info("Starting user import")
         users_created = 0
 
@@ -165,14 +197,14 @@ class Neo4jLoader:
             result = tx.run(users_query, batch=batch)
             return result.consume().counters.nodes_created
 
-        def create_friend_relationships(tx, user_id, friend_batch):
-            """Create friend relationships in small batches."""
+        def create_friend_relationships(tx, batch):
+            """Create the friend relationships of a batch of {user_id, friend_id} pairs."""
             friends_query = """
-            MATCH (u:User {user_id: $user_id})
-            UNWIND $friends AS friend_id
-            MERGE (friend:User {user_id: friend_id})
+            UNWIND $batch AS edge
+            MATCH (u:User {user_id: edge.user_id})
+            MERGE (friend:User {user_id: edge.friend_id})
             MERGE (u)-[:FRIENDS_WITH]->(friend)"""
-            tx.run(friends_query, user_id=user_id, friends=friend_batch)
+            tx.run(friends_query, batch=batch)
 
         def clean_user_data(user_data):
             """Clean and validate user data before import."""
@@ -204,59 +236,108 @@ class Neo4jLoader:
 
             return user_data
 
+        checkpoint = LoadCheckpoint(checkpoint_path, file_path) if checkpoint_path else None
+        phase, start = 'users', 0
+        if checkpoint:
+            if checkpoint.complete:
+                self.logger.info(f"Users of {file_path} were already loaded (checkpoint {checkpoint_path})")
+                return
+            phase, start = checkpoint.state.get('phase', 'users'), checkpoint.offset
+            if checkpoint.resumed:
+                self.logger.info(f"Resuming the {phase} pass at byte {start:,}")
+
         # First pass: Create all user nodes
-        batch = []
-        with open(file_path, 'r', encoding='utf-8') as file:
-            for line in file:
+        if phase == 'users':
+            tuner = self.batch_tuner('User', batch_size)
+            batch = []
+            batch_bytes = 0
+            batch_number = checkpoint.batch if checkpoint else 0
+            for offset, line in iter_lines(file_path, start):
                 try:
-                    user = json.loads(line.strip())
+                    user = decode_json_line(line.strip())
                     # Store friends separately and remove from main user data
                     friends = user.get('friends', [])
                     user['friends'] = []  # Empty the friends list for node creation
                     user = clean_user_data(user)
-                    batch.append(user)
-
-                    if len(batch) >= batch_size:
-                        with self.driver.session() as session:
-                            users_created += session.write_transaction(create_users_only, batch)
-                            self.logger.info(f"Processed {users_created} users")
-                            batch = []
                 except json.JSONDecodeError:
                     self.logger.error(f"Failed to parse JSON line: {line.strip()}")
                     continue
                 except Exception as e:
                     self.logger.error(f"Error processing user: {str(e)}")
                     continue
+                batch.append(user)
+                # The friends are written in the second pass, so they do not count toward the batch
+                batch_bytes += len(line) - sum(len(friend) + FRIEND_SEPARATOR_BYTES for friend in friends)
+
+                # A failed write is raised, so the checkpoint never moves past users that were not written
+                if tuner.full(len(batch), batch_bytes):
+                    with self.driver.session() as session:
+                        users_created += self.write_batch(session, tuner, batch_bytes, create_users_only, batch)
+                        self.logger.info(f"Processed {users_created} users")
+                        batch = []
+                        batch_bytes = 0
+                    batch_number += 1
+                    if checkpoint:
+                        checkpoint.save(offset, batch_number, phase='users')
 
             # Process remaining users
             if batch:
                 with self.driver.session() as session:
-                    users_created += session.write_transaction(create_users_only, batch)
-
-        # Second pass: Create friend relationships in smaller batches
+                    users_created += self.write_batch(session, tuner, batch_bytes, create_users_only, batch)
+                batch_number += 1
+            tuner.summary()
+            start = 0
+            if checkpoint:
+                checkpoint.save(start, batch_number, phase='friends')
+
+        # Second pass: Create friend relationships in batches of (user, friend) pairs across users
         self.logger.info("Starting friend relationships creation")
-        friend_batch_size = 100  # Smaller batch size for friend relationships
-
-        with open(file_path, 'r', encoding='utf-8') as file:
-            for line in file:
-                try:
-                    user = json.loads(line.strip())
-                    user_id = user['user_id']
-                    friends = user.get('friends', [])
-
-                    # Process friends in smaller batches
-                    for i in range(0, len(friends), friend_batch_size):
-                        friend_batch = friends[i:i + friend_batch_size]
-                        with self.driver.session() as session:
-                            session.write_transaction(create_friend_relationships, user_id, friend_batch)
-
-                    if len(friends) > 0:
-                        self.logger.info(f"Processed {len(friends)} friends for user {user_id}")
-
-                except Exception as e:
-                    self.logger.error(f"Error processing friends for user: {str(e)}")
-                    continue
-
+        # Starts smaller than the node batches: every friendship is two MERGEs
+        friend_tuner = self.batch_tuner('FRIENDS_WITH', max(batch_size // 10, 1))
+        friendships = 0
+
+        def write_friendships(pairs):
+            """Write the pairs of whole users in transactions of at most the tuned size, split evenly so
+            the tuner is not fed a small remainder"""
+            transactions = -(-len(pairs) // friend_tuner.size)
+            size = -(-len(pairs) // transactions)
+            with self.driver.session() as session:
+                for i in range(0, len(pairs), size):
+                    friend_batch = pairs[i:i + size]
+                    self.write_batch(session, friend_tuner,
+                                     sum(len(pair['friend_id']) + FRIEND_SEPARATOR_BYTES for pair in friend_batch),
+                                     create_friend_relationships, friend_batch)
+
+        pairs = []
+        pairs_bytes = 0
+        for offset, line in iter_lines(file_path, start):
+            try:
+                user = decode_json_line(line.strip())
+                user_id = user['user_id']
+                friends = user.get('friends', [])
+            except (json.JSONDecodeError, KeyError) as e:
+                self.logger.error(f"Error processing friends for user: {str(e)}")
+                continue
+            pairs += [{'user_id': user_id, 'friend_id': friend_id} for friend_id in friends]
+            pairs_bytes += sum(len(friend) + FRIEND_SEPARATOR_BYTES for friend in friends)
+
+            # Flushed only between users, so every user before offset is committed once it returns;
+            # a failed write is raised and leaves the checkpoint behind. MERGE makes replaying the
+            # users after the last saved offset harmless, so the checkpoint is written every few seconds.
+            if friend_tuner.full(len(pairs), pairs_bytes):
+                write_friendships(pairs)
+                friendships += len(pairs)
+                self.logger.info(f"Processed {friendships} friendships")
+                pairs = []
+                pairs_bytes = 0
+                if checkpoint:
+                    checkpoint.save_if_due(offset, phase='friends')
+        if pairs:
+            write_friendships(pairs)
+
+        friend_tuner.summary()
+        if checkpoint:
+            checkpoint.finish()
         self.logger.info(f"Completed user import. Total users created: {users_created}")
 
 
@@ -285,18 +366,22 @@ class Neo4jLoader:
             result = tx.run(tips_query, batch=batch)
             return result.consume().counters.nodes_created
 
+        tuner = self.batch_tuner('Tip', batch_size)
         batch = []
+        batch_bytes = 0
         with open(file_path, 'r', encoding='utf-8') as file:
             for line in file:
                 try:
-                    tip = json.loads(line.strip())
+                    tip = decode_json_line(line.strip())
                     batch.append(tip)
+                    batch_bytes += len(line)
 
-                    if len(batch) >= batch_size:
+                    if tuner.full(len(batch), batch_bytes):
                         with self.driver.session() as session:
-                            tips_created += session.write_transaction(create_tips_batch, batch)
+                            tips_created += self.write_batch(session, tuner, batch_bytes, create_tips_batch, batch)
                             self.logger.info(f"Processed {tips_created} tips")
                             batch = []
+                            batch_bytes = 0
                 except json.JSONDecodeError:
                     self.logger.error(f"Failed to parse JSON line: {line.strip()}")
                     continue
@@ -307,10 +392,99 @@ class Neo4jLoader:
             # Process remaining tips
             if batch:
                 with self.driver.session() as session:
-                    tips_created += session.write_transaction(create_tips_batch, batch)
+                    tips_created += self.write_batch(session, tuner, batch_bytes, create_tips_batch, batch)
+        tuner.summary()
 
         self.logger.info(f"Completed tips import. Total tips created: {tips_created}")
 
+    def load_friend_edges(self, file_path: str, batch_size: int = 1000):
+        """Load the friend edges of a delta batch (<preset>_delta<k>_friends.json) between existing users."""
+        self.logger.info("Starting friend edge import")
+        edges_created = 0
+
+        def create_friend_edges(tx, batch):
+            query = """
+            UNWIND $batch AS edge
+            MATCH (u:User {user_id: edge.user_id})
+            MATCH (friend:User {user_id: edge.friend_id})
+            MERGE (u)-[:FRIENDS_WITH]->(friend)
+            """
+            result = tx.run(query, batch=batch)
+            return result.consume().counters.relationships_created
+
+        tuner = self.batch_tuner('FRIENDS_WITH', batch_size)
+        batch = []
+        batch_bytes = 0
+        with open(file_path, 'r', encoding='utf-8') as file, self.driver.session() as session:
+            for line in file:
+                try:
+                    batch.append(decode_json_line(line.strip()))
+                except json.JSONDecodeError:
+                    self.logger.error(f"Failed to parse JSON line: {line.strip()}")
+                    continue
+                batch_bytes += len(line)
+
+                if tuner.full(len(batch), batch_bytes):
+                    edges_created += self.write_batch(session, tuner, batch_bytes, create_friend_edges, batch)
+                    self.logger.info(f"Processed {edges_created} friend edges")
+                    batch = []
+                    batch_bytes = 0
+
+            if batch:
+                edges_created += self.write_batch(session, tuner, batch_bytes, create_friend_edges, batch)
+        tuner.summary()
+
+        self.logger.info(f"Completed friend edge import. Total edges created: {edges_created}")
+
+    def load_delta(self, users_path: str, tips_path: str, friends_path: str, batch_size: int = 1000):
+        """Append one delta batch from the dataset generator on top of an existing load.
+
+        Users and tips are MERGEd, so existing nodes are left alone and only the new ones are created.
+        """
+        self.load_users(users_path, batch_size)
+        self.load_tips(tips_path, batch_size)
+        self.load_friend_edges(friends_path, batch_size)
+
+    def load_id_map(self, file_path: str, batch_size: int = 1000):
+        """Store the original Yelp IDs of an int_ids dataset as yelp_id on User and Business nodes."""
+        self.logger.info("Starting ID map import")
+        mapped = 0
+
+        def set_yelp_ids(tx, label, key, batch):
+            query = f"""
+            UNWIND $batch AS row
+            MATCH (n:{label} {{{key}: row.id}})
+            SET n.yelp_id = row.yelp_id
+            """
+            tx.run(query, batch=batch)
+
+        targets = {'user': ('User', 'user_id'), 'business': ('Business', 'business_id')}
+        tuners = {kind: self.batch_tuner(f"{label}.yelp_id", batch_size) for kind, (label, _) in targets.items()}
+        batches = {kind: [] for kind in targets}
+        batch_bytes = {kind: 0 for kind in targets}
+        with open(file_path, 'r', encoding='utf-8') as file, self.driver.session() as session:
+            for line in file:
+                kind, surrogate_id, yelp_id = line.rstrip('\n').split('\t')
+                batches[kind].append({'id': int(surrogate_id), 'yelp_id': yelp_id})
+                batch_bytes[kind] += len(line)
+                if tuners[kind].full(len(batches[kind]), batch_bytes[kind]):
+                    self.write_batch(session, tuners[kind], batch_bytes[kind], set_yelp_ids, *targets[kind],
+                                     batches[kind])
+                    mapped += len(batches[kind])
+                    batches[kind] = []
+                    batch_bytes[kind] = 0
+            for kind, batch in batches.items():
+                if batch:
+                    self.write_batch(session, tuners[kind], batch_bytes[kind], set_yelp_ids, *targets[kind], batch)
+                    mapped += len(batch)
+            session.run("CREATE INDEX user_yelp_id IF NOT EXISTS FOR (u:User) ON (u.yelp_id)")
+            session.run("CREATE INDEX business_yelp_id IF NOT EXISTS FOR (b:Business) ON (b.yelp_id)")
+
+        for tuner in tuners.values():
+            tuner.summary()
+
+        self.logger.info(f"Completed ID map import. Total IDs mapped: {mapped}")
+
     def run_query(self, query: str, parameters: Dict[str, Any] = None):
         with self.driver.session() as session:
             result = session.run(query, parameters)